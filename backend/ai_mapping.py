@@ -1,6 +1,10 @@
 def run_ai_mapping(bank1_file, bank2_file, save_folder):
+    """bank2_file may be a single path (two-bank run) or a {bank: path} dict for N banks."""
     print(f"[ai_mapping] Starting AI mapping...")
-    result = auto_map(bank1_file, bank2_file, save_folder)
+    if isinstance(bank2_file, dict):
+        result = auto_map_hub(bank1_file, bank2_file, save_folder)
+    else:
+        result = auto_map(bank1_file, bank2_file, save_folder)
     print(f"[ai_mapping] AI mapping complete. Results saved to {save_folder}")
     return result
 # ai_mapping.py
@@ -8,12 +12,75 @@ from sentence_transformers import SentenceTransformer, util
 import torch
 import json
 import os
+import numpy as np
+import mapping_state
+from mapping_index import build_mapping_index
+from mapping_state import fingerprint
+from banks import bank_names, hub_bank
+from content_signatures import LSH_BANDS, NUM_PERM, LSHIndex, content_score, load_signatures, signatures_for
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 CONF_THRESHOLD = 73.0
 TEXT_KEY = "description"
+HUB_MAPPING_FILE = "hub_mapping.json"
+EMBED_CACHE_MAX = 50000
+SIGNATURE_FILE = "column_signatures.json"
+# Share of the final confidence taken from column contents (MinHash + value shapes)
+CONTENT_WEIGHT = 0.25
 
-model = SentenceTransformer(MODEL_NAME)
+# CPU inference tuning (no GPU on the servers):
+#   AI_MAPPING_MODE     fp32 (default) | int8 (dynamic quantization of Linear layers) | onnx (onnxruntime backend)
+#   AI_MAPPING_THREADS  torch intra-op threads; 0 keeps torch's default
+#   AI_MAPPING_BATCH    encode batch size
+INFERENCE_MODE = os.getenv("AI_MAPPING_MODE", "fp32").lower()
+OPTIMIZED_MODES = ("int8", "onnx")
+TORCH_THREADS = int(os.getenv("AI_MAPPING_THREADS", "0"))
+BATCH_SIZE = int(os.getenv("AI_MAPPING_BATCH", "64"))
+
+# Optimized modes must agree with fp32 on at least this share of best matches,
+# and no confidence may move by more than CONF_TOLERANCE points
+MIN_AGREEMENT = 0.98
+CONF_TOLERANCE = 2.0
+
+if TORCH_THREADS > 0:
+    torch.set_num_threads(TORCH_THREADS)
+
+def load_model(mode=INFERENCE_MODE):
+    """Return (model, mode actually loaded); unavailable or unknown modes fall back to fp32."""
+    if mode == "onnx":
+        try:
+            return SentenceTransformer(MODEL_NAME, device="cpu", backend="onnx"), "onnx"
+        except Exception as e:
+            print(f"[ai_mapping] ONNX backend unavailable ({e}); falling back to fp32")
+            mode = "fp32"
+    if mode == "int8":
+        fp32 = SentenceTransformer(MODEL_NAME, device="cpu")
+        return torch.quantization.quantize_dynamic(fp32, {torch.nn.Linear}, dtype=torch.qint8), "int8"
+    if mode != "fp32":
+        print(f"[ai_mapping] Unknown AI_MAPPING_MODE '{mode}'; using fp32")
+    return SentenceTransformer(MODEL_NAME), "fp32"
+
+model, MODEL_MODE = load_model()
+
+# Persisted similarity state is only reused when it was built with these settings
+SIMILARITY_SETTINGS = fingerprint(MODEL_NAME, MODEL_MODE, TEXT_KEY, CONF_THRESHOLD, CONTENT_WEIGHT, LSH_BANDS, NUM_PERM)
+
+def encode_with(m, texts):
+    # SentenceTransformer.encode already batches length-sorted texts and returns input order
+    return m.encode(texts, convert_to_tensor=True, batch_size=BATCH_SIZE)
+
+# text -> embedding; lets the hub schema be encoded once for all N banks
+_embedding_cache = {}
+
+def encode(texts):
+    missing = [t for t in dict.fromkeys(texts) if t not in _embedding_cache]
+    if missing:
+        if len(_embedding_cache) + len(missing) > EMBED_CACHE_MAX:
+            _embedding_cache.clear()
+            missing = list(dict.fromkeys(texts))
+        embeddings = encode_with(model, missing)
+        _embedding_cache.update(zip(missing, embeddings))
+    return torch.stack([_embedding_cache[t] for t in texts])
 
 def load_json(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
@@ -24,35 +91,139 @@ def save_json(data, file_path):
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def map_table_names(bank1_json, bank2_json):
-    tables1 = list(bank1_json["tables"].keys())
-    tables2 = list(bank2_json["tables"].keys())
+def _lsh_candidates(mask, rows, cols, sigs1, sigs2):
+    """Set mask[i, j] for each row i in `rows` sharing an LSH band bucket with a column j in `cols`."""
+    index = LSHIndex()
+    for j in cols:
+        index.add(int(j), sigs1[j])
+    if not index.buckets:
+        return
+    for i in rows:
+        hits = index.query(sigs2[i])
+        if hits:
+            mask[i, sorted(hits)] = True
 
-    embeddings1 = model.encode(tables1, convert_to_tensor=True)
-    embeddings2 = model.encode(tables2, convert_to_tensor=True)
-    cosine_scores = util.cos_sim(embeddings2, embeddings1)
+def pair_scores(lines1, lines2, fps1, fps2, sigs1=None, sigs2=None, prev=None):
+    """
+    Similarity state for one pair of lists: cosine matrix (list2 rows x list1
+    columns), LSH candidate mask and content scores. Cells whose row and column
+    fingerprints are both in `prev` are copied; only new rows/columns are scored.
+    Returns (state, number of cells computed).
+    """
+    use_content = bool(sigs1 and sigs2)
+    cos, new_r, new_c = mapping_state.reuse(prev, "cos", fps2, fps1, np.float32(np.nan))
+    lsh, _, _ = mapping_state.reuse(prev, "lsh", fps2, fps1, False)
+    content, _, _ = mapping_state.reuse(prev, "content", fps2, fps1, np.float32(np.nan))
+    if lines1 and len(new_r):
+        cos[new_r] = util.cos_sim(encode([lines2[i] for i in new_r]), encode(lines1)).cpu().numpy()
+        if use_content:
+            # New rows look up their bands in an index over all columns
+            _lsh_candidates(lsh, new_r, range(len(sigs1)), sigs1, sigs2)
+    if lines2 and len(new_c):
+        cos[:, new_c] = util.cos_sim(encode(lines2), encode([lines1[j] for j in new_c])).cpu().numpy()
+        if use_content:
+            # Every row looks up its bands in an index over just the new columns
+            _lsh_candidates(lsh, range(len(sigs2)), new_c, sigs1, sigs2)
+    if use_content:
+        for i, j in zip(*np.nonzero(lsh & np.isnan(content))):
+            score = content_score(sigs1[j], sigs2[i])
+            if score is not None:
+                content[i, j] = score
+    computed = len(new_r) * len(fps1) + (len(fps2) - len(new_r)) * len(new_c)
+    return {"rows": fps2, "cols": fps1, "cos": cos, "lsh": lsh, "content": content}, computed
 
-    results = []
-    rename_dict = {}
-    for i, table2 in enumerate(tables2):
-        best_idx = cosine_scores[i].argmax().item()
-        best_score = cosine_scores[i][best_idx].item()
-        confidence = best_score * 100
-        status = "Needs Review" if confidence < CONF_THRESHOLD else "Confident Match"
-        table1 = tables1[best_idx]
+def best_match(state, i, sigs1=None, sigs2=None):
+    """
+    Best column for row i: the top cosine match, or with content signatures
+    the best blended score among it and the row's LSH candidates.
+    Returns (index, cosine, confidence, extra fields).
+    """
+    cos = state["cos"]
+    best_idx = int(cos[i].argmax())
+    confidence = float(cos[i][best_idx]) * 100
+    if not (sigs1 and sigs2 and sigs2[i]):
+        return best_idx, float(cos[i][best_idx]), confidence, {}
+
+    blended = {}
+    for j in sorted({best_idx} | set(np.flatnonzero(state["lsh"][i]).tolist())):
+        c = float(cos[i][j])
+        content = state["content"][i, j]
+        content = content_score(sigs1[j], sigs2[i]) if np.isnan(content) else float(content)
+        score = c if content is None else (1 - CONTENT_WEIGHT) * c + CONTENT_WEIGHT * content
+        blended[j] = (score, content)
+    pick = max(blended, key=lambda j: blended[j][0])
+    content = blended[pick][1]
+    extra = {
+        "embedding_confidence": round(float(cos[i][pick]) * 100, 2),
+        "content_score": round(content, 4) if content is not None else None,
+        "match_source": "embedding" if pick == best_idx else "content",
+    }
+    return pick, float(cos[i][pick]), blended[pick][0] * 100, extra
 
+def _table_matches(tables1, tables2, prev=None):
+    state, computed = pair_scores(tables1, tables2, [fingerprint(t) for t in tables1],
+                                  [fingerprint(t) for t in tables2], prev=prev)
+    results, picks = [], []
+    for i, table2 in enumerate(tables2):
+        j, score, confidence, _ = best_match(state, i)
+        picks.append(state["cols"][j])
         results.append({
             "bank2_table": table2,
-            "best_match_bank1_table": table1,
-            "cosine_similarity": round(best_score, 4),
+            "best_match_bank1_table": tables1[j],
+            "cosine_similarity": round(score, 4),
             "confidence_rating": round(confidence, 2),
-            "status": status
+            "status": "Needs Review" if confidence < CONF_THRESHOLD else "Confident Match"
         })
+    state["picks"] = picks
+    return results, state, computed
 
-        if status == "Confident Match":
-            rename_dict[table2] = table1
+def _column_matches(list1, list2, text_key=TEXT_KEY, conf_threshold=CONF_THRESHOLD, sigs1=None, sigs2=None, prev=None):
+    state, computed = pair_scores(
+        [col[text_key] for col in list1], [col[text_key] for col in list2],
+        [fingerprint(c, s) for c, s in zip(list1, sigs1 or [None] * len(list1))],
+        [fingerprint(c, s) for c, s in zip(list2, sigs2 or [None] * len(list2))],
+        sigs1, sigs2, prev,
+    )
+    results, picks = [], []
+    for i, col2 in enumerate(list2):
+        j, score, confidence, extra = best_match(state, i, sigs1, sigs2)
+        picks.append(state["cols"][j])
+        results.append({
+            "bank2_column": col2,
+            "best_match_bank1_column": list1[j],
+            "cosine_similarity": round(score, 4),
+            "confidence_rating": round(confidence, 2),
+            "status": "Needs Review" if confidence < conf_threshold else "Confident Match",
+            **extra
+        })
+    state["picks"] = picks
+    return results, state, computed
+
+def _carry_over(results, state, prev, saved, row_key, target_key, target_labels):
+    """Swap in last run's saved rows where keep_saved() allows; returns how many were kept."""
+    saved_rows = {}
+    for r in saved or []:
+        saved_rows.setdefault(row_key(r), []).append(r)
+    kept = 0
+    for i, r in enumerate(results):
+        queue = saved_rows.get(row_key(r))
+        if not queue:
+            continue
+        s = queue.pop(0)
+        target = s.get(target_key)
+        exists = (target.get("label") if isinstance(target, dict) else target) in target_labels
+        unchanged = mapping_state.previous_pick(prev, state["rows"][i]) == state["picks"][i]
+        if mapping_state.keep_saved(s, exists, unchanged):
+            results[i] = s
+            kept += 1
+    return kept
 
-    return results, rename_dict
+def _rename_dict(table_mapping):
+    return {r["bank2_table"]: r["best_match_bank1_table"] for r in table_mapping if r["status"] == "Confident Match"}
+
+def map_table_names(bank1_json, bank2_json):
+    results, _, _ = _table_matches(list(bank1_json["tables"].keys()), list(bank2_json["tables"].keys()))
+    return results, _rename_dict(results)
 
 def rename_bank2_tables(bank2_json, rename_dict):
     tables2 = bank2_json["tables"]
@@ -60,56 +231,181 @@ def rename_bank2_tables(bank2_json, rename_dict):
     bank2_json["tables"] = renamed_tables
     return bank2_json
 
-def map_columns(list1, list2, text_key=TEXT_KEY, conf_threshold=CONF_THRESHOLD):
-    lines1 = [col[text_key] for col in list1]
-    lines2 = [col[text_key] for col in list2]
+def map_columns(list1, list2, text_key=TEXT_KEY, conf_threshold=CONF_THRESHOLD, sigs1=None, sigs2=None):
+    """
+    Match each bank2 column to a bank1 column by description embeddings. With
+    content signatures (aligned with list1/list2), LSH candidates that share
+    values are also scored and the best blended confidence wins.
+    """
+    return _column_matches(list1, list2, text_key, conf_threshold, sigs1, sigs2)[0]
 
-    embeddings1 = model.encode(lines1, convert_to_tensor=True)
-    embeddings2 = model.encode(lines2, convert_to_tensor=True)
+def map_against_hub(hub_json, bank_json, signatures=None, hub_name=None, bank_name=None, prev=None, saved=None):
+    """
+    Map one bank's schema onto the canonical hub schema (tables, then columns).
+    `signatures` is the column_signatures.json store written by merge_banks.
+    `prev` is this bank's similarity state from the last run and `saved` its
+    last hub_mapping.json entry; unchanged rows keep their saved results.
+    Returns (table_mapping, renamed schema, column_mapping, new state, stats).
+    """
+    prev = prev or {}
+    saved = saved or {}
+    tables1 = list(hub_json["tables"].keys())
+    table_mapping, table_state, computed = _table_matches(
+        tables1, list(bank_json["tables"].keys()), prev.get(mapping_state.TABLES_KEY)
+    )
+    kept = _carry_over(table_mapping, table_state, prev.get(mapping_state.TABLES_KEY), saved.get("table_mapping"),
+                       lambda r: r["bank2_table"], "best_match_bank1_table", set(tables1))
+    state = {mapping_state.TABLES_KEY: table_state}
+    cells = table_state["cos"].size
 
-    cosine_scores = util.cos_sim(embeddings2, embeddings1)
-    results = []
+    rename_dict = _rename_dict(table_mapping)
+    original_names = {new: old for old, new in rename_dict.items()}
+    renamed = rename_bank2_tables(bank_json, rename_dict)
 
-    for i, col2 in enumerate(list2):
-        best_idx = cosine_scores[i].argmax().item()
-        best_score = cosine_scores[i][best_idx].item()
-        confidence = best_score * 100
-        status = "Needs Review" if confidence < conf_threshold else "Confident Match"
-        col1 = list1[best_idx]
+    column_mapping_results = {}
+    saved_columns = saved.get("column_mapping") or {}
+    for table_name, columns2 in renamed["tables"].items():
+        columns1 = hub_json["tables"].get(table_name)
+        if not columns1:
+            continue
+        sigs1 = sigs2 = None
+        if signatures:
+            sigs1 = signatures_for(signatures, hub_name, table_name, [c["label"] for c in columns1])
+            sigs2 = signatures_for(signatures, bank_name, original_names.get(table_name, table_name),
+                                   [c["label"] for c in columns2])
+        results, pair, n = _column_matches(columns1, columns2, sigs1=sigs1, sigs2=sigs2, prev=prev.get(table_name))
+        kept += _carry_over(results, pair, prev.get(table_name), saved_columns.get(table_name),
+                            lambda r: fingerprint(r["bank2_column"]), "best_match_bank1_column",
+                            {c.get("label") for c in columns1})
+        column_mapping_results[table_name] = results
+        state[table_name] = pair
+        computed += n
+        cells += pair["cos"].size
+    stats = {"cells": cells, "cells_computed": computed, "saved_rows_kept": kept}
+    return table_mapping, renamed, column_mapping_results, state, stats
 
-        results.append({
-            "bank2_column": col2,
-            "best_match_bank1_column": col1,
-            "cosine_similarity": round(best_score, 4),
-            "confidence_rating": round(confidence, 2),
-            "status": status
-        })
-    return results
+def schema_texts(schema_json, text_key=TEXT_KEY):
+    texts = set(schema_json["tables"])
+    for columns in schema_json["tables"].values():
+        texts.update(c[text_key] for c in columns)
+    return texts
+
+def auto_map_hub(hub_file, bank_files, save_folder):
+    """
+    N-way mapping: every bank in bank_files ({bank: schema path}) is matched
+    against the hub schema only. Results go to hub_mapping.json; the first
+    bank's results are also written to the legacy two-bank files. Similarity
+    state from the previous run (see mapping_state.py) limits re-scoring to
+    the fields that changed.
+    """
+    hub_json = load_json(hub_file)
+    signatures = load_signatures(os.path.join(save_folder, SIGNATURE_FILE))
+    if signatures:
+        print("[ai_mapping] Using column content signatures alongside description embeddings")
+    device = getattr(model, "device", "cpu")
+    for text, vector in mapping_state.load_embeddings(save_folder, SIMILARITY_SETTINGS).items():
+        _embedding_cache.setdefault(text, torch.from_numpy(vector).to(device))
+    hub_path = os.path.join(save_folder, HUB_MAPPING_FILE)
+    previous = load_json(hub_path).get("banks", {}) if os.path.exists(hub_path) else {}
+
+    banks_out = {}
+    texts = schema_texts(hub_json)
+    for i, (bank, bank_file) in enumerate(bank_files.items()):
+        print(f"[ai_mapping] Mapping {bank} onto the canonical schema...")
+        bank_json = load_json(bank_file)
+        texts |= schema_texts(bank_json)
+        table_mapping, renamed, column_mapping, state, stats = map_against_hub(
+            hub_json, bank_json, signatures, hub_bank(), bank,
+            mapping_state.load_state(save_folder, bank, SIMILARITY_SETTINGS), previous.get(bank),
+        )
+        mapping_state.save_state(save_folder, bank, SIMILARITY_SETTINGS, state)
+        print(
+            f"[ai_mapping] {bank}: scored {stats['cells_computed']} of {stats['cells']} cells, "
+            f"kept {stats['saved_rows_kept']} saved matches"
+        )
+        banks_out[bank] = {"table_mapping": table_mapping, "column_mapping": column_mapping}
+        if i == 0:
+            save_json(renamed, os.path.join(save_folder, "bank2_renamed_schema.json"))
+            save_json(table_mapping, os.path.join(save_folder, "table_name_mapping.json"))
+            save_json(column_mapping, os.path.join(save_folder, "bank_column_mapping.json"))
+
+    mapping_state.save_embeddings(save_folder, SIMILARITY_SETTINGS, {
+        t: _embedding_cache[t].cpu().numpy() for t in texts if t in _embedding_cache
+    })
+    save_json(
+        {"canonical_bank": hub_bank(), "banks": banks_out},
+        hub_path,
+    )
+    build_mapping_index(save_folder)
+
+    first = next(iter(banks_out.values()), {})
+    return {
+        "column_mapping": first.get("column_mapping", {}),
+        "banks": {b: r["column_mapping"] for b, r in banks_out.items()},
+    }
 
 def auto_map(bank1_file, bank2_file, save_folder):
-    # Load schemas
+    result = auto_map_hub(bank1_file, {bank_names()[1]: bank2_file}, save_folder)
+    return {"column_mapping": result["column_mapping"]}
+
+def compare_inference_modes(bank1_file, bank2_file, mode=INFERENCE_MODE,
+                            min_agreement=MIN_AGREEMENT, conf_tolerance=CONF_TOLERANCE):
+    """
+    Check an optimized mode against the fp32 model: for every bank2 column in
+    tables present in both schemas, the best bank1 match must agree on at least
+    `min_agreement` of columns and confidence must stay within `conf_tolerance`.
+    """
+    if mode not in OPTIMIZED_MODES:
+        raise ValueError(f"mode must be one of {', '.join(OPTIMIZED_MODES)}, got '{mode}'")
+    candidate, loaded = (model, MODEL_MODE) if mode == INFERENCE_MODE else load_model(mode)
+    if loaded != mode:
+        # Comparing the fp32 fallback with fp32 would always pass
+        raise RuntimeError(f"{mode} inference is unavailable here (fell back to {loaded}); nothing to compare")
+    reference, _ = load_model("fp32")
     bank1_json = load_json(bank1_file)
     bank2_json = load_json(bank2_file)
 
-    # Table mapping
-    table_mapping, rename_dict = map_table_names(bank1_json, bank2_json)
-    renamed_bank2 = rename_bank2_tables(bank2_json, rename_dict)
-
-    # Column mapping
-    column_mapping_results = {}
-    for table_name, columns2 in renamed_bank2["tables"].items():
+    total = agree = 0
+    max_delta = 0.0
+    for table_name, columns2 in bank2_json["tables"].items():
         columns1 = bank1_json["tables"].get(table_name)
-        if not columns1:
+        if not columns1 or not columns2:
             continue
-        mapped_columns = map_columns(columns1, columns2)
-        column_mapping_results[table_name] = mapped_columns
-
-    # Save outputs
-    save_json(renamed_bank2, os.path.join(save_folder, "bank2_renamed_schema.json"))
-    save_json(table_mapping, os.path.join(save_folder, "table_name_mapping.json"))
-    save_json(column_mapping_results, os.path.join(save_folder, "bank_column_mapping.json"))
-        
+        lines1 = [col[TEXT_KEY] for col in columns1]
+        lines2 = [col[TEXT_KEY] for col in columns2]
+        best = []
+        for m in (reference, candidate):
+            scores = util.cos_sim(encode_with(m, lines2), encode_with(m, lines1))
+            best.append(scores.max(dim=1))
+        total += len(lines2)
+        agree += int((best[0].indices == best[1].indices).sum().item())
+        max_delta = max(max_delta, float((best[0].values - best[1].values).abs().max().item()) * 100)
 
-    return {
-        "column_mapping": column_mapping_results
+    agreement = agree / total if total else 1.0
+    result = {
+        "mode": mode,
+        "columns_compared": total,
+        "best_match_agreement": round(agreement, 4),
+        "max_confidence_delta": round(max_delta, 2),
+        "within_tolerance": agreement >= min_agreement and max_delta <= conf_tolerance,
     }
+    print(f"[ai_mapping] {mode} vs fp32: {result}")
+    return result
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    mode = args[2].lower() if len(args) > 2 else INFERENCE_MODE
+    if len(args) not in (2, 3) or mode not in OPTIMIZED_MODES:
+        print(
+            f"usage: python ai_mapping.py BANK1_SCHEMA BANK2_SCHEMA [{'|'.join(OPTIMIZED_MODES)}]\n"
+            "Compares the mode (default: AI_MAPPING_MODE) against fp32; exits 1 if outside tolerance.",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    try:
+        ok = compare_inference_modes(args[0], args[1], mode=mode)["within_tolerance"]
+    except RuntimeError as e:
+        print(f"[ai_mapping] {e}", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,49 @@
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).parent
+BANKS_FILE = BASE_DIR / "banks.json"
+
+# Institutions taking part in the merge. The first entry is the canonical hub:
+# every other bank's schema is mapped onto it, so cost grows linearly with N.
+# Drop a banks.json next to this file (same shape) to onboard more banks.
+DEFAULT_BANKS = [
+    {"name": "BankA", "schema": "bank1__bank1_schema.json"},
+    {"name": "BankB", "schema": "bank2__bank2_schema.json"},
+]
+
+def load_banks() -> List[Dict[str, str]]:
+    if BANKS_FILE.exists():
+        with open(BANKS_FILE, "r", encoding="utf-8") as f:
+            banks = json.load(f)
+        if isinstance(banks, list) and banks:
+            return banks
+    return DEFAULT_BANKS
+
+def bank_names() -> List[str]:
+    return [b["name"] for b in load_banks()]
+
+def hub_bank() -> str:
+    return load_banks()[0]["name"]
+
+def resolve_bank(name: str) -> Optional[str]:
+    """Map user input like 'a', 'bankb', 'Bank_C' onto a configured bank folder name."""
+    key = re.sub(r"[^a-z0-9]+", "", (name or "").lower())
+    for bank in bank_names():
+        full = re.sub(r"[^a-z0-9]+", "", bank.lower())
+        short = full[4:] if full.startswith("bank") else full
+        if key in (full, short):
+            return bank
+    return None
+
+def table_prefixes(bank: str) -> List[str]:
+    """SQLite table-name prefixes written by merge_banks for this bank (e.g. BankA, Bank_A, banka)."""
+    return [bank, re.sub(r"^(bank)_?(.+)$", r"\1_\2", bank, flags=re.I), bank.lower()]
+
+def schema_files(schema_dir) -> Tuple[str, Dict[str, str]]:
+    """Return (hub schema path, {other bank: schema path}) under schema_dir."""
+    banks = load_banks()
+    paths = [str(Path(schema_dir) / b["schema"]) for b in banks]
+    return paths[0], {b["name"]: p for b, p in zip(banks[1:], paths[1:])}
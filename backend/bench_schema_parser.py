@@ -0,0 +1,56 @@
+"""
+Benchmark parse_schema_workbook (vectorized) against the row-wise reference
+on generated data-dictionary workbooks, and check the JSON output is identical.
+
+    python bench_schema_parser.py [rows_per_sheet] [sheets]
+"""
+import io
+import json
+import random
+import sys
+import time
+
+import pandas as pd
+
+from schema_parser import parse_schema_workbook, parse_schema_workbook_rowwise
+
+WORDS = ["customer", "account", "balance", "open", "date", "rate", "branch", "code",
+         "status", "type", "amount", "key", "time", "holder", "Value", "price", "ID"]
+DESCS = ["", None, "n/a", "  The   customer's primary identifier  ", "balance at close",
+         "Interest rate applied monthly", "Date opened!", "ß-ish text", 0, 3.5]
+
+def generate_workbook(rows_per_sheet: int, sheets: int, seed: int = 7) -> bytes:
+    rnd = random.Random(seed)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        for s in range(sheets):
+            records = [["Data dictionary", None, None], [None, None, None],
+                       ["Field Name", "Description", "Notes"]]
+            for i in range(rows_per_sheet):
+                label = "_".join(rnd.sample(WORDS, rnd.randint(1, 3)))
+                if rnd.random() < 0.05:
+                    label = rnd.choice([None, "", "  name ", 0, 12])
+                desc = rnd.choice(DESCS) if rnd.random() < 0.5 else f"{label} {' '.join(rnd.sample(WORDS, 4))}"
+                records.append([label, desc, None])
+            pd.DataFrame(records).to_excel(writer, sheet_name=f"Table{s}", header=False, index=False)
+    return buf.getvalue()
+
+def bench(fn, data: bytes):
+    start = time.perf_counter()
+    out = fn(data, "BankX_schema.xlsx")
+    return out, time.perf_counter() - start
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sheets = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    data = generate_workbook(rows, sheets)
+
+    fast, t_fast = bench(parse_schema_workbook, data)
+    ref, t_ref = bench(parse_schema_workbook_rowwise, data)
+
+    identical = json.dumps(fast, ensure_ascii=False) == json.dumps(ref, ensure_ascii=False)
+    print(f"[bench] {sheets} sheet(s) x {rows} rows")
+    print(f"[bench] row-wise:   {t_ref:.2f}s")
+    print(f"[bench] vectorized: {t_fast:.2f}s ({t_ref / t_fast:.1f}x)")
+    print(f"[bench] identical JSON: {identical}")
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,98 @@
+"""
+Benchmark the unified-table API on a generated multi-million-row table:
+time-to-first-byte, total time and peak Python memory of each export format,
+and a deep keyset page against the equivalent OFFSET query.
+
+    python bench_unified_export.py [rows] [formats]      e.g. 2000000 csv,parquet
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from unified_query import _encode_cursor, ensure_key_indexes, export_table, fetch_page
+
+TABLE = "Unified_Customer"
+
+def generate_db(path: Path, rows: int, seed: int = 11) -> None:
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        f'CREATE TABLE "{TABLE}" (customerId TEXT, fullName TEXT, accountNumber INTEGER, '
+        "balance REAL, openDate TIMESTAMP, bank_origin TEXT)"
+    )
+    batch = []
+    for i in range(rows):
+        batch.append((
+            f"C{rnd.randrange(rows * 2):09d}", f"Customer {i}", rnd.randrange(10**9),
+            round(rnd.uniform(-500, 250000), 2) if rnd.random() > 0.02 else None,
+            f"20{rnd.randint(10, 25)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)} 00:00:00",
+            "BankA" if i % 2 else "BankB",
+        ))
+        if len(batch) == 100_000:
+            conn.executemany(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?)', batch)
+            batch.clear()
+    if batch:
+        conn.executemany(f'INSERT INTO "{TABLE}" VALUES (?, ?, ?, ?, ?, ?)', batch)
+    ensure_key_indexes(conn, TABLE)
+    conn.close()
+
+def bench_export(db: Path, fmt: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    ttfb, size = None, 0
+    for chunk in export_table(TABLE, fmt, db_path=db):
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ttfb, total, peak, size
+
+def bench_deep_page(db: Path, rows: int):
+    depth = rows - 1000
+    conn = sqlite3.connect(db)
+    start = time.perf_counter()
+    conn.execute(f'SELECT * FROM "{TABLE}" ORDER BY customerId, rowid LIMIT 100 OFFSET ?', (depth,)).fetchall()
+    t_offset = time.perf_counter() - start
+    value, rowid = conn.execute(
+        f'SELECT customerId, rowid FROM "{TABLE}" ORDER BY customerId, rowid LIMIT 1 OFFSET ?', (depth - 1,)
+    ).fetchone()
+    conn.close()
+
+    cursor = _encode_cursor(value, rowid)
+    start = time.perf_counter()
+    fetch_page(TABLE, 100, cursor, "customerId", db_path=db)
+    return t_offset, time.perf_counter() - start
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    formats = sys.argv[2].split(",") if len(sys.argv) > 2 else ["csv", "parquet", "xlsx"]
+
+    fd, name = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db = Path(name)
+    try:
+        start = time.perf_counter()
+        generate_db(db, rows)
+        print(f"[bench] {TABLE}: {rows} rows generated in {time.perf_counter() - start:.1f}s "
+              f"({db.stat().st_size / 2**20:.0f} MiB)")
+
+        t_offset, t_keyset = bench_deep_page(db, rows)
+        print(f"[bench] page at depth {rows - 1000}: OFFSET {t_offset * 1000:.1f}ms, keyset {t_keyset * 1000:.1f}ms")
+
+        for fmt in formats:
+            try:
+                ttfb, total, peak, size = bench_export(db, fmt)
+            except ImportError as e:
+                print(f"[bench] {fmt}: skipped ({e})")
+                continue
+            print(f"[bench] {fmt:8s} ttfb={ttfb:.2f}s total={total:.1f}s "
+                  f"size={size / 2**20:.0f} MiB peak_py_mem={peak / 2**20:.1f} MiB")
+    finally:
+        db.unlink()
@@ -1,65 +1,174 @@
 import os
 import json
-from typing import Dict, List
-
-# Load table name mapping
-with open('Table_name_mapping.json', 'r', encoding='utf-8') as f:
-    all_mappings = json.load(f)
-
-# ✅ Step 1: Keep only confident matches
-confident_mappings = [
-    entry for entry in all_mappings
-    if entry['status'].strip().lower() == 'confident match'
-]
-
-# ✅ Step 2: Build lookup dictionaries only for confident pairs
-bank2_to_logical = {
-    entry['bank2_table'].lower().replace(' ', '').replace('_', ''): entry['best_match_bank1_table']
-    for entry in confident_mappings
-}
-bank1_to_logical = {
-    entry['best_match_bank1_table'].lower().replace(' ', '').replace('_', ''): entry['best_match_bank1_table']
-    for entry in confident_mappings
-}
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from banks import bank_names
+
+TABLE_MAPPING_FILE = 'Table_name_mapping.json'
+EXTRACT_SUFFIXES = ('.csv', '.xlsx')
 
 def clean_name(name: str) -> str:
     return os.path.splitext(name)[0].lower().replace(' ', '').replace('_', '')
 
-def infer_logical_table(filename: str, bank: str) -> str:
-    clean_filename = clean_name(filename)
-    if bank == 'BankB':
-        for bank2_key, logical in bank2_to_logical.items():
-            if bank2_key in clean_filename:
-                return logical
-    elif bank == 'BankA':
-        for logical_key in bank1_to_logical:
-            if logical_key in clean_filename:
-                return bank1_to_logical[logical_key]
-    return None
-
-def build_merge_ready_manifest(bank_folders: Dict[str, str]) -> Dict[str, List[Dict]]:
+def _clean_key(name: str) -> str:
+    return name.lower().replace(' ', '').replace('_', '')
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over normalized table keys. One pass over a filename
+    finds every key it contains; like the old linear scan, the key registered
+    first wins when several match.
+    """
+
+    def __init__(self, keys: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]   # lowest-priority key ending in this state
+        self._values: List[Any] = []
+        for priority, (key, value) in enumerate(keys):
+            self._values.append(value)
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                    self._goto[state][ch] = nxt
+                state = nxt
+            if self._best[state] is None:
+                self._best[state] = priority
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+    def first_match(self, text: str) -> Any:
+        state, best = 0, self._best[0]
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            found = self._best[state]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return self._values[best] if best is not None else None
+
+# Per-bank matchers, populated by load_table_mapping()
+_matchers: Dict[str, KeywordMatcher] = {}
+
+def _confident(rows: List[Dict]) -> List[Dict]:
+    return [
+        entry for entry in rows
+        if entry['status'].strip().lower() == 'confident match'
+    ]
+
+def load_table_mapping(path: str = TABLE_MAPPING_FILE) -> Dict[str, KeywordMatcher]:
+    """
+    Load a table mapping and compile one matcher per bank. Accepts the legacy
+    two-bank list or hub_mapping.json ({"canonical_bank", "banks": {...}}).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict) and 'banks' in data:
+        hub = data['canonical_bank']
+        per_bank = {bank: _confident(r.get('table_mapping', [])) for bank, r in data['banks'].items()}
+    else:
+        names = bank_names()
+        hub = names[0]
+        per_bank = {names[1]: _confident(data)}
+
+    # Keys are built as dicts (first position, last value) to match the old lookup tables
+    matchers: Dict[str, KeywordMatcher] = {}
+    hub_keys: Dict[str, str] = {}
+    for bank, confident_mappings in per_bank.items():
+        bank_keys = {
+            _clean_key(entry['bank2_table']): entry['best_match_bank1_table']
+            for entry in confident_mappings
+        }
+        matchers[bank] = KeywordMatcher(bank_keys.items())
+        for entry in confident_mappings:
+            hub_keys[_clean_key(entry['best_match_bank1_table'])] = entry['best_match_bank1_table']
+    matchers[hub] = KeywordMatcher(hub_keys.items())
+
+    _matchers.clear()
+    _matchers.update(matchers)
+    return matchers
+
+def infer_logical_table(filename: str, bank: str, matchers: Optional[Dict[str, KeywordMatcher]] = None) -> Optional[str]:
+    matchers = _matchers if matchers is None else matchers
+    if not matchers:
+        raise RuntimeError("No table mapping loaded; call load_table_mapping() first")
+    matcher = matchers.get(bank)
+    if matcher is None:
+        return None
+    return matcher.first_match(clean_name(filename))
+
+def _list_dir(path: str) -> Tuple[List[str], List[str]]:
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.name.endswith(EXTRACT_SUFFIXES):
+                    files.append(entry.path)
+    except OSError as e:
+        print(f"[⚠️ Unreadable] {path}: {e}")
+    return dirs, files
+
+def find_extract_files(bank_folders: Dict[str, str], pool: ThreadPoolExecutor) -> Dict[str, List[str]]:
+    """Walk every bank's tree at once, fanning directory listings out across the pool."""
+    found: Dict[str, List[str]] = {bank: [] for bank in bank_folders}
+    pending = [(bank, pool.submit(_list_dir, folder)) for bank, folder in bank_folders.items()]
+    while pending:
+        bank, listing = pending.pop()
+        dirs, files = listing.result()
+        found[bank].extend(files)
+        pending.extend((bank, pool.submit(_list_dir, d)) for d in dirs)
+    return {bank: sorted(files) for bank, files in found.items()}
+
+def build_merge_ready_manifest(bank_folders: Dict[str, str],
+                               matchers: Optional[Dict[str, KeywordMatcher]] = None,
+                               workers: Optional[int] = None) -> Dict[str, List[Dict]]:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        extracts = find_extract_files(bank_folders, pool)
+
     manifest = {}
-    for bank, folder in bank_folders.items():
-        for root, _, files in os.walk(folder):
-            for file in files:
-                if file.endswith(('.csv', '.xlsx')):
-                    logical_table = infer_logical_table(file, bank)
-                    rel_path = os.path.relpath(os.path.join(root, file))
-                    if logical_table:
-                        manifest.setdefault(logical_table, []).append({
-                            "source": rel_path.replace('\\', '/'),
-                            "bank": bank
-                        })
-                    else:
-                        print(f"[⚠️ No Confident Match] {file} from {bank}")
+    for bank, paths in extracts.items():
+        for path in paths:
+            file = os.path.basename(path)
+            logical_table = infer_logical_table(file, bank, matchers)
+            rel_path = os.path.relpath(path)
+            if logical_table:
+                manifest.setdefault(logical_table, []).append({
+                    "source": rel_path.replace('\\', '/'),
+                    "bank": bank
+                })
+            else:
+                print(f"[⚠️ No Confident Match] {file} from {bank}")
     return manifest
 
 if __name__ == '__main__':
     base_path = os.getcwd()
-    bank_folders = {
-        'BankA': os.path.join(base_path, 'BankA'),
-        'BankB': os.path.join(base_path, 'BankB')
-    }
+    load_table_mapping(os.path.join(base_path, TABLE_MAPPING_FILE))
+    bank_folders = {bank: os.path.join(base_path, bank) for bank in bank_names()}
 
     merge_manifest = build_merge_ready_manifest(bank_folders)
 
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+BASE_DIR = Path(__file__).parent.resolve()
+INCOMING_DIR = BASE_DIR / ".incoming"
+HASH_BLOCK = 1024 * 1024
+# Sessions with no chunk written for this long are discarded (checked whenever a new one starts)
+SESSION_TTL = 24 * 3600
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+class UploadNotFound(KeyError):
+    pass
+
+
+class OffsetMismatch(ValueError):
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk offset must equal the confirmed offset {expected}")
+        self.expected = expected
+
+
+class ChecksumMismatch(ValueError):
+    pass
+
+
+class SizeExceeded(ValueError):
+    def __init__(self, total_size: int, confirmed: int):
+        super().__init__(f"Chunk runs past the declared total_size of {total_size} bytes")
+        self.total_size = total_size
+        self.confirmed = confirmed
+
+
+# --- Session bookkeeping (one .json sidecar per .part file, so resumes survive restarts) ---
+
+def _meta_path(upload_id: str) -> Path:
+    return INCOMING_DIR / f"{upload_id}.json"
+
+def _part_path(upload_id: str) -> Path:
+    return INCOMING_DIR / f"{upload_id}.part"
+
+def _save_meta(meta: Dict[str, Any]) -> None:
+    tmp = _meta_path(meta["upload_id"]).with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp, _meta_path(meta["upload_id"]))
+
+def get_upload(upload_id: str) -> Dict[str, Any]:
+    """Return the session state, including the last confirmed byte offset."""
+    if not upload_id.isalnum():
+        raise UploadNotFound(upload_id)
+    path = _meta_path(upload_id)
+    if not path.exists():
+        raise UploadNotFound(upload_id)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def expire_uploads(max_age: float = SESSION_TTL) -> int:
+    """Remove sessions whose .part file has not been written to for `max_age` seconds."""
+    if not INCOMING_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age
+    expired = 0
+    for meta in INCOMING_DIR.glob("*.json"):
+        upload_id = meta.stem
+        lock = _locks.get(upload_id)
+        if lock is not None and lock.locked():
+            continue
+        part = _part_path(upload_id)
+        try:
+            last_write = (part if part.exists() else meta).stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if last_write >= cutoff:
+            continue
+        meta.unlink(missing_ok=True)
+        part.unlink(missing_ok=True)
+        _locks.pop(upload_id, None)
+        expired += 1
+    if expired:
+        print(f"[chunked_upload] Expired {expired} abandoned upload session(s)")
+    return expired
+
+def init_upload(bank_folder: str, filename: str, total_size: Optional[int] = None) -> Dict[str, Any]:
+    """Start a chunked upload session for a file destined for <bank_folder>/uploads."""
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    expire_uploads()
+    meta = {
+        "upload_id": uuid.uuid4().hex,
+        "bank": bank_folder,
+        "filename": Path(filename).name,
+        "total_size": total_size,
+        "offset": 0,
+        "created": datetime.now().isoformat(),
+    }
+    _part_path(meta["upload_id"]).touch()
+    _save_meta(meta)
+    return meta
+
+
+# --- Chunk writes ---
+
+async def append_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    Write a chunk starting at `offset`, which must equal the confirmed offset.
+    Disk I/O runs in worker threads so the event loop stays free. If the client
+    disconnects mid-chunk, the bytes already written are still confirmed.
+    Bytes past the declared total_size are refused before they hit the disk.
+    """
+    lock = _locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        try:
+            meta = await asyncio.to_thread(get_upload, upload_id)
+        except UploadNotFound:
+            _locks.pop(upload_id, None)
+            raise
+        if offset != meta["offset"]:
+            raise OffsetMismatch(meta["offset"])
+
+        limit = meta.get("total_size")
+        f = await asyncio.to_thread(open, _part_path(upload_id), "r+b")
+        written = 0
+        try:
+            await asyncio.to_thread(f.seek, offset)
+            await asyncio.to_thread(f.truncate, offset)
+            async for piece in chunks:
+                if piece:
+                    if limit is not None and offset + written + len(piece) > limit:
+                        raise SizeExceeded(limit, offset + written)
+                    await asyncio.to_thread(f.write, piece)
+                    written += len(piece)
+        finally:
+            await asyncio.to_thread(f.close)
+            meta["offset"] = offset + written
+            await asyncio.to_thread(_save_meta, meta)
+        return meta
+
+
+# --- Finalize ---
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _commit(upload_id: str, meta: Dict[str, Any], sha256: Optional[str]) -> Path:
+    part = _part_path(upload_id)
+    if meta.get("total_size") is not None and meta["offset"] != meta["total_size"]:
+        raise ChecksumMismatch(f"Received {meta['offset']} of {meta['total_size']} bytes")
+    if sha256:
+        digest = _sha256(part)
+        if digest.lower() != sha256.lower():
+            raise ChecksumMismatch(f"sha256 mismatch: expected {sha256}, got {digest}")
+
+    upload_dir = BASE_DIR / meta["bank"] / "uploads"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    dest = upload_dir / meta["filename"]
+    os.replace(part, dest)
+    _meta_path(upload_id).unlink(missing_ok=True)
+    return dest
+
+async def finalize_upload(upload_id: str, sha256: Optional[str] = None) -> Path:
+    """Verify size/checksum and move the assembled file into the bank's upload folder."""
+    lock = _locks.setdefault(upload_id, asyncio.Lock())
+    try:
+        async with lock:
+            meta = await asyncio.to_thread(get_upload, upload_id)
+            dest = await asyncio.to_thread(_commit, upload_id, meta, sha256)
+    except UploadNotFound:
+        _locks.pop(upload_id, None)
+        raise
+    _locks.pop(upload_id, None)
+    print(f"✅ File saved to: {dest}")
+    return dest
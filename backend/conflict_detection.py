@@ -0,0 +1,200 @@
+import json, re, sqlite3, time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from banks import hub_bank
+from unified_query import KEY_COLUMN
+
+BASE = Path(__file__).parent
+DB_PATH = BASE / "merged_banks.db"
+REPORT_FILE = BASE / "Conflict_Report.json"
+# Optional {"Unified_Customer": ["customerId"], ...}; tables not listed use a detected key
+KEYS_FILE = BASE / "conflict_keys.json"
+UNIFIED_PREFIX = "Unified_"
+SAMPLE_SIZE = 5
+FETCH_BATCH = 10_000
+
+def norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", (s or "").lower())
+
+def load_key_config(path: Path = KEYS_FILE) -> Dict[str, List[str]]:
+    if not Path(path).exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def detect_keys(table: str, cols: List[str]) -> List[str]:
+    """Key-like column, preferring one named after the entity (customerId for Unified_Customer)."""
+    keys = [c for c in cols if c != "bank_origin" and KEY_COLUMN.search(c)]
+    entity = norm(table[len(UNIFIED_PREFIX):])
+    keys.sort(key=lambda c: not norm(c).startswith(entity))
+    return keys[:1]
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+def _canon(expr: str) -> str:
+    # Text compared ignoring case, surrounding/embedded spaces and -, / separators
+    return (
+        f"CASE WHEN typeof({expr}) = 'text' THEN "
+        f"LOWER(REPLACE(REPLACE(REPLACE({expr}, ' ', ''), '-', ''), '/', '')) ELSE {expr} END"
+    )
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz", " -/")
+
+def _canon_py(v):
+    # Mirrors _canon (SQLite's LOWER only folds ASCII) for the few sample rows classified in Python
+    return v.translate(_ASCII_LOWER) if isinstance(v, str) else v
+
+def _conditions(col: str) -> Dict[str, str]:
+    a, b = f"a.{_q(col)}", f"b.{_q(col)}"
+    return {
+        "value": f"({a} IS NOT NULL AND {b} IS NOT NULL AND {_canon(a)} IS NOT {_canon(b)})",
+        "format": f"({a} IS NOT {b} AND {_canon(a)} = {_canon(b)})",
+        "missing": f"(({a} IS NULL) <> ({b} IS NULL))",
+    }
+
+def _materialize(conn: sqlite3.Connection, name: str, table: str, bank: str, keys: List[str], cols: List[str]) -> Dict:
+    """One row per key for `bank` in a temp table indexed on the key (first row wins on duplicates)."""
+    key_list = ", ".join(_q(k) for k in keys)
+    not_null = " AND ".join(f"{_q(k)} IS NOT NULL" for k in keys)
+    conn.execute(f"DROP TABLE IF EXISTS temp.{name}")
+    conn.execute(
+        f"CREATE TEMP TABLE {name} AS SELECT {', '.join(_q(c) for c in keys + cols)} FROM {_q(table)} "
+        f"WHERE rowid IN (SELECT MIN(rowid) FROM {_q(table)} WHERE bank_origin = ? AND {not_null} GROUP BY {key_list})",
+        (bank,),
+    )
+    conn.execute(f"CREATE INDEX temp.{name}_key ON {name} ({key_list})")
+    rows = conn.execute(f"SELECT COUNT(*) FROM {_q(table)} WHERE bank_origin = ? AND {not_null}", (bank,)).fetchone()[0]
+    unique = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    return {"rows_with_key": rows, "unique_keys": unique, "duplicate_key_rows": rows - unique}
+
+def compare_banks(conn: sqlite3.Connection, table: str, hub: str, other: str, keys: List[str], cols: List[str]) -> Dict:
+    """Join hub and `other` on the key and count value/format/missing conflicts for every column in one pass."""
+    side_a = _materialize(conn, "cd_a", table, hub, keys, cols)
+    side_b = _materialize(conn, "cd_b", table, other, keys, cols)
+    join = "FROM cd_a AS a JOIN cd_b AS b ON " + " AND ".join(f"a.{_q(k)} = b.{_q(k)}" for k in keys)
+    conds = {c: _conditions(c) for c in cols}
+
+    sums = ["COUNT(*)"] + [f"SUM({expr})" for c in cols for expr in conds[c].values()]
+    totals = conn.execute(f"SELECT {', '.join(sums)} {join}").fetchone()
+    matched = totals[0]
+    counts = {}
+    for i, c in enumerate(cols):
+        value, fmt, missing = (int(x or 0) for x in totals[1 + 3 * i:4 + 3 * i])
+        counts[c] = {"value_conflicts": value, "format_only": fmt, "missing_one_side": missing}
+
+    # Second pass fetches example rows, restricted to columns that actually have conflicts
+    samples = {c: {k: [] for k in conds[c]} for c in cols}
+    needed = {(c, kind) for c in cols for kind, n in zip(conds[c], counts[c].values()) if n}
+    if needed:
+        select = [f"a.{_q(k)}" for k in keys] + [f"{side}.{_q(c)}" for c in cols for side in ("a", "b")]
+        where = " OR ".join(conds[c][kind] for c, kind in sorted(needed))
+        cur = conn.execute(f"SELECT {', '.join(select)} {join} WHERE {where}")
+        while needed:
+            rows = cur.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                key = row[:len(keys)]
+                for i, c in enumerate(cols):
+                    a, b = row[len(keys) + 2 * i], row[len(keys) + 2 * i + 1]
+                    if a == b:
+                        continue
+                    kind = "missing" if (a is None) != (b is None) else (
+                        "format" if _canon_py(a) == _canon_py(b) else "value")
+                    if (c, kind) in needed:
+                        samples[c][kind].append({"key": list(key), hub: a, other: b})
+                        if len(samples[c][kind]) >= SAMPLE_SIZE:
+                            needed.discard((c, kind))
+                if not needed:
+                    break
+        cur.close()
+
+    conn.execute("DROP TABLE IF EXISTS temp.cd_a")
+    conn.execute("DROP TABLE IF EXISTS temp.cd_b")
+
+    columns = {}
+    for c in cols:
+        columns[c] = {
+            **counts[c],
+            "conflict_rate": round((counts[c]["value_conflicts"] + counts[c]["format_only"]) / matched, 6) if matched else 0.0,
+            "samples": {k: v for k, v in samples[c].items() if v},
+        }
+    return {
+        "banks": [hub, other],
+        "matched_keys": matched,
+        f"{hub}_only": side_a["unique_keys"] - matched,
+        f"{other}_only": side_b["unique_keys"] - matched,
+        "key_stats": {hub: side_a, other: side_b},
+        "columns": columns,
+    }
+
+def detect_table_conflicts(conn: sqlite3.Connection, table: str, keys: Optional[List[str]] = None) -> Optional[Dict]:
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({_q(table)})")]
+    if "bank_origin" not in cols:
+        return None
+    keys = keys or detect_keys(table, cols)
+    if not keys or any(k not in cols for k in keys):
+        return None
+    present = [r[0] for r in conn.execute(f"SELECT DISTINCT bank_origin FROM {_q(table)} WHERE bank_origin IS NOT NULL")]
+    hub = hub_bank()
+    if hub not in present or len(present) < 2:
+        return None
+
+    compare = [c for c in cols if c not in keys and c != "bank_origin"]
+    start = time.perf_counter()
+    pairs = [compare_banks(conn, table, hub, other, keys, compare) for other in sorted(present) if other != hub]
+    return {
+        "table": table,
+        "keys": keys,
+        "compared_columns": compare,
+        "comparisons": pairs,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def run_conflict_detection(keys: Optional[Dict[str, List[str]]] = None, db_path: Path = DB_PATH) -> bool:
+    print("[conflict_detection] Starting cross-bank conflict detection...")
+    if not Path(db_path).exists():
+        print(f"[conflict_detection] DB not found: {db_path}")
+        return False
+
+    config = {**load_key_config(), **(keys or {})}
+    conn = sqlite3.connect(db_path)
+    report, skipped = [], []
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?", (UNIFIED_PREFIX + "%",)
+        )]
+        for table in tables:
+            result = detect_table_conflicts(conn, table, config.get(table))
+            if result is None:
+                print(f"[conflict_detection] {table}: no key column or hub bank missing; skipping")
+                skipped.append(table)
+                continue
+            report.append(result)
+            for pair in result["comparisons"]:
+                conflicted = sum(1 for c in pair["columns"].values() if c["value_conflicts"] or c["format_only"])
+                print(
+                    f"[conflict_detection] ✅ {table} {' vs '.join(pair['banks'])} on {result['keys']}: "
+                    f"matched={pair['matched_keys']}, columns with conflicts={conflicted}/{len(pair['columns'])} "
+                    f"({result['seconds']}s)"
+                )
+    finally:
+        conn.close()
+
+    out = {
+        "timestamp": datetime.now().isoformat(),
+        "db_path": str(db_path),
+        "hub_bank": hub_bank(),
+        "tables": report,
+        "skipped_tables": skipped,
+    }
+    Path(REPORT_FILE).write_text(json.dumps(out, indent=2, default=str), encoding="utf-8")
+    print(f"[conflict_detection] Report: {REPORT_FILE}")
+    print("[conflict_detection] Done.")
+    return True
+
+if __name__ == "__main__":
+    run_conflict_detection()
@@ -0,0 +1,143 @@
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from generate_physical_mappings import best_prefix_tables, score_name, norm
+from banks import table_prefixes
+from sketches import as_keys
+
+SIGNATURE_FILE = Path(__file__).parent / "schemas" / "column_signatures.json"
+NUM_PERM = 128
+LSH_BANDS = 32                   # 32 bands x 4 rows: candidates from ~0.4 Jaccard up
+PATTERN_SAMPLE = 5_000
+TOP_PATTERNS = 10
+
+_rng = np.random.default_rng(20251005)
+_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+
+# --- Signatures (built while merge_banks has each column in memory) ---
+
+def minhash(values: np.ndarray) -> np.ndarray:
+    """MinHash over distinct values using multiply-shift hashing on pandas' 64-bit value hash."""
+    if not len(values):
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    h = pd.util.hash_array(values)
+    mins = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(h), 8192):
+            block = h[start:start + 8192, None] * _A + _B
+            mins = np.minimum(mins, block.min(axis=0))
+    return mins
+
+def value_patterns(s: pd.Series) -> Dict[str, Any]:
+    """Shape summary: 'AB-123' -> 'A-9', plus numeric share, length and distinctness."""
+    sample = s.dropna().astype(str).head(PATTERN_SAMPLE)
+    shapes = sample.str.replace(r"[A-Za-z]+", "A", regex=True).str.replace(r"\d+", "9", regex=True)
+    dist = shapes.value_counts(normalize=True).head(TOP_PATTERNS)
+    return {
+        "null_rate": round(float(s.isna().mean()), 4) if len(s) else 0.0,
+        "numeric_share": round(float(pd.to_numeric(sample, errors="coerce").notna().mean()), 4) if len(sample) else 0.0,
+        "mean_length": round(float(sample.str.len().mean()), 2) if len(sample) else 0.0,
+        "patterns": {k: round(float(v), 4) for k, v in dist.items()},
+    }
+
+def column_signature(s: pd.Series) -> Dict[str, Any]:
+    # Every distinct value is hashed (minhash works in blocks): a prefix or sample would
+    # differ between banks for high-cardinality ID columns and sink their Jaccard
+    distinct = pd.unique(as_keys(s))
+    return {
+        "minhash": [int(x) for x in minhash(distinct)],
+        "distinct": len(distinct),
+        **value_patterns(s),
+    }
+
+def build_table_signatures(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    return {str(c): column_signature(df[c]) for c in df.columns if c != "bank_origin"}
+
+def load_signatures(path=SIGNATURE_FILE) -> Dict[str, Dict[str, Dict]]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_signatures(store: Dict, path=SIGNATURE_FILE) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f)
+    os.replace(tmp, path)
+
+# --- Similarity ---
+
+def jaccard(a: Dict, b: Dict) -> float:
+    if not a.get("distinct") or not b.get("distinct"):
+        return 0.0
+    return float(np.mean(np.asarray(a["minhash"], dtype=np.uint64) == np.asarray(b["minhash"], dtype=np.uint64)))
+
+def pattern_similarity(a: Dict, b: Dict) -> float:
+    pa, pb = a.get("patterns", {}), b.get("patterns", {})
+    if not pa or not pb:
+        return 0.0
+    l1 = sum(abs(pa.get(k, 0.0) - pb.get(k, 0.0)) for k in pa.keys() | pb.keys())
+    return 0.8 * (1 - 0.5 * l1) + 0.2 * (1 - abs(a["numeric_share"] - b["numeric_share"]))
+
+def content_score(a: Optional[Dict], b: Optional[Dict]) -> Optional[float]:
+    """Value overlap (MinHash Jaccard) blended with value-shape similarity, in [0, 1]."""
+    if not a or not b:
+        return None
+    return 0.5 * jaccard(a, b) + 0.5 * pattern_similarity(a, b)
+
+class LSHIndex:
+    """Banded MinHash LSH: columns sharing any band bucket become candidates."""
+
+    def __init__(self, bands: int = LSH_BANDS):
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.buckets = defaultdict(set)
+
+    def _keys(self, sig: Dict):
+        mh = sig["minhash"]
+        for b in range(self.bands):
+            yield b, tuple(mh[b * self.rows:(b + 1) * self.rows])
+
+    def add(self, key: Any, sig: Optional[Dict]) -> None:
+        if sig and sig.get("distinct"):
+            for k in self._keys(sig):
+                self.buckets[k].add(key)
+
+    def query(self, sig: Optional[Dict]) -> set:
+        out = set()
+        if sig and sig.get("distinct"):
+            for k in self._keys(sig):
+                out |= self.buckets.get(k, set())
+        return out
+
+# --- Lookup from logical schema names to stored physical signatures ---
+
+def signatures_for(store: Dict, bank: str, logical_table: str, labels: List[str]) -> List[Optional[Dict]]:
+    """Signatures aligned with `labels`, resolving the bank's physical table/columns by name."""
+    tables = store.get(bank) or {}
+    cands = best_prefix_tables(list(tables), table_prefixes(bank))
+    if not cands:
+        return [None] * len(labels)
+    table = max(cands, key=lambda t: score_name(t, logical_table))
+    if score_name(table, logical_table) == 0:
+        return [None] * len(labels)
+    cols = tables[table]
+    by_norm = {norm(c): c for c in cols}
+    out = []
+    for label in labels:
+        col = by_norm.get(norm(label))
+        if col is None and cols:
+            best = max(cols, key=lambda c: score_name(c, label))
+            col = best if score_name(best, label) > 0 else None
+        out.append(cols[col] if col else None)
+    return out
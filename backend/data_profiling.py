@@ -0,0 +1,226 @@
+import hashlib, json, sqlite3
+from datetime import datetime
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from sketches import HyperLogLog, QuantileSketch, SpaceSaving
+from unified_query import KEY_COLUMN, table_generation
+
+BASE = Path(__file__).parent
+DB_PATH = BASE / "merged_banks.db"
+PROFILE_FILE = BASE / "Data_Profile.json"
+STATE_TABLE = "Profile_State"
+UNIFIED_PREFIX = "Unified_"
+CHUNK_ROWS = 50_000
+TOP_K = 10
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.95, 0.99]
+HEAD_ROWS = 100          # rows hashed into the rebuild marker
+
+
+class ColumnProfile:
+    """Null counts + HLL + top-k (+ quantiles for numeric data); mergeable and JSON-serializable."""
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.hll = HyperLogLog()
+        self.topk = SpaceSaving()
+        self.numeric: Optional[QuantileSketch] = None
+        self.by_bank: Dict[str, HyperLogLog] = {}
+
+    def update(self, s: pd.Series, banks: Optional[pd.Series] = None) -> None:
+        self.rows += len(s)
+        self.nulls += int(s.isna().sum())
+        self.hll.update(s)
+        self.topk.update(s)
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            if self.numeric is None:
+                self.numeric = QuantileSketch()
+            self.numeric.update(s)
+        if banks is not None:
+            for bank, part in s.groupby(banks, sort=False):
+                self.by_bank.setdefault(str(bank), HyperLogLog()).update(part)
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        out = ColumnProfile()
+        out.rows, out.nulls = self.rows + other.rows, self.nulls + other.nulls
+        out.hll = self.hll.merge(other.hll)
+        out.topk = self.topk.merge(other.topk)
+        if self.numeric and other.numeric:
+            out.numeric = self.numeric.merge(other.numeric)
+        else:
+            out.numeric = self.numeric or other.numeric
+        for bank in self.by_bank.keys() | other.by_bank.keys():
+            a, b = self.by_bank.get(bank), other.by_bank.get(bank)
+            out.by_bank[bank] = a.merge(b) if a and b else (a or b)
+        return out
+
+    def summary(self) -> Dict:
+        out = {
+            "rows": self.rows,
+            "null_rate": round(self.nulls / self.rows, 6) if self.rows else None,
+            "distinct_estimate": round(self.hll.estimate()),
+            "top_values": self.topk.top(TOP_K),
+        }
+        if self.numeric is not None and self.numeric.count:
+            out["numeric"] = {
+                "min": self.numeric.min,
+                "max": self.numeric.max,
+                "mean": self.numeric.sum / self.numeric.count,
+                "quantiles": {f"p{int(q * 100)}": self.numeric.quantile(q) for q in QUANTILES},
+            }
+        return out
+
+    def to_dict(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "nulls": self.nulls,
+            "hll": self.hll.to_dict(),
+            "topk": self.topk.to_dict(),
+            "numeric": self.numeric.to_dict() if self.numeric else None,
+            "by_bank": {b: h.to_dict() for b, h in self.by_bank.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "ColumnProfile":
+        out = cls()
+        out.rows, out.nulls = d["rows"], d["nulls"]
+        out.hll = HyperLogLog.from_dict(d["hll"])
+        out.topk = SpaceSaving.from_dict(d["topk"])
+        out.numeric = QuantileSketch.from_dict(d["numeric"]) if d.get("numeric") else None
+        out.by_bank = {b: HyperLogLog.from_dict(h) for b, h in d.get("by_bank", {}).items()}
+        return out
+
+
+def key_overlap(profile: ColumnProfile) -> Dict[str, Dict]:
+    """Pairwise cross-bank overlap of distinct keys via HLL inclusion–exclusion."""
+    out = {}
+    for a, b in combinations(sorted(profile.by_bank), 2):
+        ha, hb = profile.by_bank[a], profile.by_bank[b]
+        na, nb, union = ha.estimate(), hb.estimate(), ha.merge(hb).estimate()
+        shared = max(0.0, na + nb - union)
+        out[f"{a}|{b}"] = {
+            "distinct": {a: round(na), b: round(nb)},
+            "overlap_estimate": round(shared),
+            "jaccard": round(shared / union, 4) if union else 0.0,
+        }
+    return out
+
+# --- Stored sketch state (lets an incremental merge profile only new rows) ---
+
+def _ensure_state_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{STATE_TABLE}" '
+        "(table_name TEXT PRIMARY KEY, last_rowid INTEGER, updated TEXT, state TEXT, marker TEXT)"
+    )
+    if "marker" not in {r[1] for r in conn.execute(f'PRAGMA table_info("{STATE_TABLE}")')}:
+        conn.execute(f'ALTER TABLE "{STATE_TABLE}" ADD COLUMN marker TEXT')
+
+def rebuild_marker(conn: sqlite3.Connection, table: str, upto: int) -> str:
+    """
+    Changes whenever the table is rewritten rather than appended to: the
+    generation id transform_unified records, plus a hash of the first rows
+    (covers tables written by anything else), limited to rows up to `upto`
+    so appends leave it unchanged.
+    """
+    head = conn.execute(
+        f'SELECT * FROM "{table}" WHERE rowid <= ? ORDER BY rowid LIMIT ?', (upto, HEAD_ROWS)
+    ).fetchall()
+    digest = hashlib.sha1(repr(head).encode("utf-8")).hexdigest()
+    return f"{table_generation(conn, table) or '-'}:{digest}"
+
+def load_state(conn: sqlite3.Connection, table: str):
+    row = conn.execute(f'SELECT last_rowid, state, marker FROM "{STATE_TABLE}" WHERE table_name = ?', (table,)).fetchone()
+    if not row:
+        return 0, {}, None
+    return row[0], {c: ColumnProfile.from_dict(d) for c, d in json.loads(row[1]).items()}, row[2]
+
+def save_state(conn: sqlite3.Connection, table: str, last_rowid: int, profiles: Dict[str, ColumnProfile], marker: str) -> None:
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{STATE_TABLE}" (table_name, last_rowid, updated, state, marker) VALUES (?, ?, ?, ?, ?)',
+        (table, last_rowid, datetime.now().isoformat(), json.dumps({c: p.to_dict() for c, p in profiles.items()}), marker),
+    )
+    conn.commit()
+
+def profile_table(conn: sqlite3.Connection, table: str, incremental: bool = False) -> Dict:
+    """Stream the table once in chunks; with `incremental`, only rows after the stored rowid."""
+    last_rowid, profiles, stored_marker = load_state(conn, table) if incremental else (0, {}, None)
+    profiled_rows = max((p.rows for p in profiles.values()), default=0)
+    still_there = conn.execute(f'SELECT COUNT(*) FROM "{table}" WHERE rowid <= ?', (last_rowid,)).fetchone()[0]
+    if profiles and (stored_marker != rebuild_marker(conn, table, last_rowid) or still_there != profiled_rows):
+        # Table was rebuilt (not appended to) since the stored state; start over
+        print(f"[data_profiling] {table}: table was replaced; rebuilding profile")
+        last_rowid, profiles = 0, {}
+
+    new_profiles: Dict[str, ColumnProfile] = {}
+    new_rows = 0
+    chunks = pd.read_sql_query(
+        f'SELECT rowid AS _rowid, * FROM "{table}" WHERE rowid > ? ORDER BY rowid',
+        conn, params=(last_rowid,), chunksize=CHUNK_ROWS,
+    )
+    for chunk in chunks:
+        if chunk.empty:
+            # An empty result still yields one empty frame; nothing new since last_rowid
+            continue
+        last_rowid = int(chunk["_rowid"].iloc[-1])
+        chunk = chunk.drop(columns="_rowid")
+        banks = chunk["bank_origin"].astype("string") if "bank_origin" in chunk else None
+        for col in chunk.columns:
+            tracks_banks = banks is not None and col != "bank_origin" and bool(KEY_COLUMN.search(col))
+            new_profiles.setdefault(col, ColumnProfile()).update(chunk[col], banks if tracks_banks else None)
+        new_rows += len(chunk)
+
+    for col, p in new_profiles.items():
+        profiles[col] = profiles[col].merge(p) if col in profiles else p
+    save_state(conn, table, last_rowid, profiles, rebuild_marker(conn, table, last_rowid))
+
+    columns = {c: p.summary() for c, p in profiles.items()}
+    null_rates = [c["null_rate"] for c in columns.values() if c["null_rate"] is not None]
+    return {
+        "table": table,
+        "rows": max((p.rows for p in profiles.values()), default=0),
+        "rows_profiled_this_run": new_rows,
+        "completeness": round(1 - sum(null_rates) / len(null_rates), 4) if null_rates else None,
+        "columns": columns,
+        "key_overlap": {c: key_overlap(p) for c, p in profiles.items() if len(p.by_bank) > 1},
+    }
+
+def run_data_profiling(tables: Optional[List[str]] = None, incremental: bool = False, db_path: Path = DB_PATH) -> bool:
+    print(f"[data_profiling] Starting {'incremental ' if incremental else ''}profiling...")
+    if not Path(db_path).exists():
+        print(f"[data_profiling] DB not found: {db_path}")
+        return False
+
+    conn = sqlite3.connect(db_path)
+    results = []
+    try:
+        _ensure_state_table(conn)
+        if tables is None:
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?", (UNIFIED_PREFIX + "%",)
+            )]
+        for table in tables:
+            result = profile_table(conn, table, incremental)
+            results.append(result)
+            print(
+                f"[data_profiling] ✅ {table}: rows={result['rows']} "
+                f"(+{result['rows_profiled_this_run']} this run), completeness={result['completeness']}"
+            )
+    finally:
+        conn.close()
+
+    profile = {
+        "timestamp": datetime.now().isoformat(),
+        "db_path": str(db_path),
+        "tables": results,
+    }
+    Path(PROFILE_FILE).write_text(json.dumps(profile, indent=2, default=str), encoding="utf-8")
+    print(f"[data_profiling] Profile: {PROFILE_FILE}")
+    print("[data_profiling] Done.")
+    return True
+
+if __name__ == "__main__":
+    run_data_profiling()
@@ -0,0 +1,81 @@
+"""
+Compact dtypes for frames on their way into SQLite. Choices are made on a
+row sample and confirmed on the full column, so the values written (and
+read back) never change: low-cardinality text becomes categorical, other
+text Arrow-backed strings (when pyarrow is installed), integers are
+downcast, and floats are narrowed only where float32 round-trips exactly.
+"""
+import importlib.util
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_ROWS = 10_000
+CATEGORY_MAX_RATIO = 0.05        # distinct / non-null values in the sample
+CATEGORY_MAX_DISTINCT = 1_000
+ARROW_STRINGS = importlib.util.find_spec("pyarrow") is not None
+STRING_DTYPE = pd.StringDtype("pyarrow") if ARROW_STRINGS else pd.StringDtype("python")
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+def _is_text(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return False
+    if s.dtype == object:
+        return pd.api.types.infer_dtype(s, skipna=True) == "string"
+    return pd.api.types.is_string_dtype(s)
+
+def _sample(s: pd.Series, n: int) -> pd.Series:
+    s = s.dropna()
+    return s.sample(n, random_state=0) if len(s) > n else s
+
+def _text(s: pd.Series, sample_rows: int) -> pd.Series:
+    sample = _sample(s, sample_rows)
+    distinct = sample.nunique()
+    if len(sample) and distinct <= CATEGORY_MAX_DISTINCT and distinct <= CATEGORY_MAX_RATIO * len(sample):
+        out = s.astype("category")
+        # The sample can miss a long tail; only keep the categorical if it really is small
+        if len(out.cat.categories) <= CATEGORY_MAX_DISTINCT:
+            return out
+    if ARROW_STRINGS and s.dtype != STRING_DTYPE:
+        return s.astype(STRING_DTYPE)
+    return s
+
+def _integer(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, downcast="unsigned" if len(s) and s.min() >= 0 else "integer")
+
+def _float(s: pd.Series) -> pd.Series:
+    if s.dtype == np.float32:
+        return s
+    narrow = s.astype(np.float32)
+    same = (narrow.astype(s.dtype) == s) | (narrow.isna() & s.isna())
+    return narrow if bool(same.all()) else s
+
+def optimize_dtypes(df: pd.DataFrame, skip: Iterable[str] = (), sample_rows: int = SAMPLE_ROWS) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Return (compacted frame, {"before": bytes, "after": bytes}); `skip` columns are left alone."""
+    before = memory_bytes(df)
+    skip = set(skip)
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in skip or s.empty:
+            out[col] = s
+        elif _is_text(s):
+            out[col] = _text(s, sample_rows)
+        elif pd.api.types.is_bool_dtype(s):
+            out[col] = s
+        elif pd.api.types.is_integer_dtype(s) and s.dtype.kind in "iu":
+            out[col] = _integer(s)
+        elif isinstance(s.dtype, np.dtype) and s.dtype.kind == "f":
+            out[col] = _float(s)
+        else:
+            out[col] = s
+    compact = pd.DataFrame(out, index=df.index)
+    return compact, {"before": before, "after": memory_bytes(compact)}
+
+def origin_column(bank: str, length: int, banks=None) -> pd.Categorical:
+    """bank_origin as a one-byte-per-row categorical; shared `banks` keep concat categorical."""
+    categories = list(banks) if banks else [bank]
+    return pd.Categorical.from_codes(np.full(length, categories.index(bank), dtype=np.int8), categories)
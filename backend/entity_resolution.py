@@ -0,0 +1,295 @@
+import json, re, sqlite3, time, zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).parent
+DB_PATH = BASE / "merged_banks.db"
+MANIFEST_FILE = BASE / "EntityResolution_Manifest.json"
+UNIFIED_PREFIX = "Unified_"
+LINK_TABLE = "Entity_Links"
+
+# Normalized column names (lowercase, no separators) recognised per comparison field
+FIELD_PATTERNS = {
+    "record_id": ["customerid", "partyid", "clientid", "customernumber"],
+    "first_name": ["firstname", "givenname", "forename"],
+    "last_name": ["lastname", "surname", "familyname"],
+    "full_name": ["fullname", "customername", "name"],
+    "dob": ["dateofbirth", "birthdate", "dob"],
+    "id_number": ["idnumber", "identificationnumber", "documentnumber", "nationalid", "sin", "ssn"],
+    "email": ["email", "emailaddress"],
+    "phone": ["phonenumber", "phone", "mobilenumber", "smsnumber"],
+}
+
+# Field weights for the final score; fields missing from a table (or empty on
+# either side of a pair) are left out and the rest re-normalised
+WEIGHTS = {"name": 0.35, "dob": 0.25, "id_number": 0.2, "email": 0.15, "phone": 0.05}
+MATCH_THRESHOLD = 0.85
+REVIEW_THRESHOLD = 0.65
+
+ID_PREFIX_LEN = 6
+SN_WINDOW = 5            # sorted-neighbourhood window
+MAX_BLOCK = 1000         # larger blocks carry little signal and explode the pair count
+SCORE_BATCH = 500_000
+SIG_BITS = 128
+
+def norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", (s or "").lower())
+
+def detect_fields(cols: List[str]) -> Dict[str, str]:
+    """Map comparison fields (last_name, dob, ...) onto this table's physical columns."""
+    by_norm = {norm(c): c for c in cols}
+    found = {}
+    for field, patterns in FIELD_PATTERNS.items():
+        for p in patterns:
+            if p in by_norm:
+                found[field] = by_norm[p]
+                break
+    return found
+
+# --- Vectorized normalization ---
+
+def _text(s: pd.Series) -> pd.Series:
+    return s.astype("string").fillna("").str.strip()
+
+def _letters(s: pd.Series) -> pd.Series:
+    return _text(s).str.lower().str.replace(r"[^a-z]", "", regex=True)
+
+def _dates(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce").dt.strftime("%Y-%m-%d").astype("string").fillna("")
+
+def normalize_records(df: pd.DataFrame, fields: Dict[str, str]) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    first = _letters(df[fields["first_name"]]) if "first_name" in fields else None
+    last = _letters(df[fields["last_name"]]) if "last_name" in fields else None
+    if last is not None:
+        out["name"] = (first + last) if first is not None else last
+        out["name_key"] = last + (first.str[:1] if first is not None else "")
+    elif "full_name" in fields:
+        out["name"] = _letters(df[fields["full_name"]])
+        out["name_key"] = out["name"]
+    if "dob" in fields:
+        out["dob"] = _dates(df[fields["dob"]])
+    if "id_number" in fields:
+        out["id_number"] = _text(df[fields["id_number"]]).str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    if "email" in fields:
+        out["email"] = _text(df[fields["email"]]).str.lower()
+    if "phone" in fields:
+        out["phone"] = _text(df[fields["phone"]]).str.replace(r"\D", "", regex=True).str[-10:]
+    return out.fillna("")
+
+# --- Blocking ---
+
+def _block_pairs(keys: np.ndarray, bank_codes: np.ndarray) -> pd.DataFrame:
+    """Cross-bank pairs of records sharing a non-empty blocking key."""
+    df = pd.DataFrame({"k": keys, "rid": np.arange(len(keys)), "bank": bank_codes})
+    df = df[df["k"] != ""]
+    sizes = df.groupby("k")["rid"].transform("size")
+    df = df[(sizes > 1) & (sizes <= MAX_BLOCK)]
+    m = df.merge(df, on="k", suffixes=("_l", "_r"))
+    m = m[m["bank_l"] < m["bank_r"]]
+    return m[["rid_l", "rid_r"]]
+
+def _sorted_neighbourhood(keys: np.ndarray, bank_codes: np.ndarray, window: int = SN_WINDOW) -> pd.DataFrame:
+    """Pairs of cross-bank records within `window` positions after sorting on the key."""
+    rids = np.flatnonzero(keys != "")
+    order = rids[np.argsort(keys[rids], kind="stable")]
+    parts = []
+    for w in range(1, window):
+        l, r = order[:-w], order[w:]
+        bl, br = bank_codes[l], bank_codes[r]
+        cross = bl != br
+        l, r, bl, br = l[cross], r[cross], bl[cross], br[cross]
+        swap = bl > br
+        parts.append(pd.DataFrame({"rid_l": np.where(swap, r, l), "rid_r": np.where(swap, l, r)}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["rid_l", "rid_r"])
+
+def candidate_pairs(recs: pd.DataFrame, bank_codes: np.ndarray) -> pd.DataFrame:
+    blocks = []
+    if "name_key" in recs and "dob" in recs:
+        name_dob = np.where((recs["name_key"] != "") & (recs["dob"] != ""),
+                            (recs["name_key"] + "|" + recs["dob"]).to_numpy(str), "")
+        blocks.append(_block_pairs(name_dob, bank_codes))
+    if "id_number" in recs:
+        ids = recs["id_number"]
+        prefix = np.where(ids.str.len() >= ID_PREFIX_LEN, ids.str[:ID_PREFIX_LEN].to_numpy(str), "")
+        blocks.append(_block_pairs(prefix, bank_codes))
+    if "email" in recs:
+        blocks.append(_block_pairs(recs["email"].to_numpy(str), bank_codes))
+    sn_key = recs.get("name", pd.Series("", index=recs.index)) + recs.get("dob", "")
+    blocks.append(_sorted_neighbourhood(sn_key.to_numpy(str), bank_codes))
+    pairs = pd.concat(blocks, ignore_index=True).drop_duplicates(ignore_index=True)
+    return pairs.astype({"rid_l": np.int64, "rid_r": np.int64})
+
+# --- Scoring ---
+
+def name_signatures(names: pd.Series) -> np.ndarray:
+    """Hashed character-trigram bitsets (SIG_BITS wide) for vectorized Jaccard."""
+    words = SIG_BITS // 64
+    sig = np.zeros((len(names), words), dtype=np.uint64)
+    for i, name in enumerate(names.tolist()):
+        if not name:
+            continue
+        padded = f"  {name} "
+        bits = 0
+        for j in range(len(padded) - 2):
+            bits |= 1 << (zlib.crc32(padded[j:j + 3].encode()) % SIG_BITS)
+        for w in range(words):
+            sig[i, w] = (bits >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+    return sig
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).sum(axis=-1)
+    return np.unpackbits(x.view(np.uint8), axis=-1).sum(axis=-1)
+
+def _exact(values: np.ndarray, l: np.ndarray, r: np.ndarray) -> np.ndarray:
+    a, b = values[l], values[r]
+    sim = (a == b).astype(float)
+    sim[(a == "") | (b == "")] = np.nan
+    return sim
+
+def score_pairs(recs: pd.DataFrame, pairs: pd.DataFrame, sig: Optional[np.ndarray]) -> np.ndarray:
+    scores = np.empty(len(pairs))
+    columns = {f: recs[f].to_numpy(str) for f in WEIGHTS if f != "name" and f in recs}
+    for start in range(0, len(pairs), SCORE_BATCH):
+        l = pairs["rid_l"].to_numpy()[start:start + SCORE_BATCH]
+        r = pairs["rid_r"].to_numpy()[start:start + SCORE_BATCH]
+        sims = {}
+        if sig is not None:
+            inter = _popcount(sig[l] & sig[r])
+            union = _popcount(sig[l] | sig[r])
+            sims["name"] = np.where(union > 0, inter / np.maximum(union, 1), np.nan)
+        for f, values in columns.items():
+            sims[f] = _exact(values, l, r)
+        stacked = np.vstack([sims[f] for f in sims])
+        weights = np.array([WEIGHTS[f] for f in sims])[:, None]
+        present = ~np.isnan(stacked)
+        total_w = (weights * present).sum(axis=0)
+        num = np.nansum(stacked * weights, axis=0)
+        scores[start:start + SCORE_BATCH] = np.where(total_w > 0, num / np.maximum(total_w, 1e-9), 0.0)
+    return scores
+
+# --- Stage runner ---
+
+def _naive_pair_count(bank_codes: np.ndarray) -> int:
+    counts = np.bincount(bank_codes).astype(np.int64)
+    return int((counts.sum() ** 2 - (counts ** 2).sum()) // 2)
+
+def _has_links(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (LINK_TABLE,)).fetchone() is not None
+
+def prune_links(conn: sqlite3.Connection, tables: List[str]) -> int:
+    """Drop links from tables that are no longer in the database."""
+    if not _has_links(conn):
+        return 0
+    marks = ", ".join("?" for _ in tables)
+    where = f"source_table NOT IN ({marks})" if tables else "1"
+    removed = conn.execute(f'DELETE FROM "{LINK_TABLE}" WHERE {where}', tables).rowcount
+    conn.commit()
+    return removed
+
+def resolve_table(conn: sqlite3.Connection, table: str) -> Optional[Dict]:
+    # Links from the previous run go first, so a table that no longer qualifies keeps none
+    if _has_links(conn):
+        conn.execute(f'DELETE FROM "{LINK_TABLE}" WHERE source_table = ?', (table,))
+        conn.commit()
+
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+    fields = detect_fields(cols)
+    if "bank_origin" not in cols or not ({"last_name", "full_name", "email", "id_number"} & fields.keys()):
+        return None
+
+    use = sorted(set(fields.values()) | {"bank_origin"})
+    col_list = ", ".join(f'"{c}"' for c in use)
+    df = pd.read_sql_query(f'SELECT rowid AS _rowid, {col_list} FROM "{table}"', conn)
+    bank_codes, bank_labels = pd.factorize(df["bank_origin"].astype("string").fillna(""))
+    if len(bank_labels) < 2:
+        return None
+
+    start = time.perf_counter()
+    recs = normalize_records(df, fields)
+    pairs = candidate_pairs(recs, bank_codes)
+    sig = name_signatures(recs["name"]) if "name" in recs else None
+    scores = score_pairs(recs, pairs, sig)
+    elapsed = time.perf_counter() - start
+
+    keep = scores >= REVIEW_THRESHOLD
+    l = pairs["rid_l"].to_numpy()[keep]
+    r = pairs["rid_r"].to_numpy()[keep]
+    ids = df[fields["record_id"]].astype("string") if "record_id" in fields else pd.Series(pd.NA, index=df.index)
+    links = pd.DataFrame({
+        "source_table": table,
+        "left_bank": np.asarray(bank_labels)[bank_codes[l]],
+        "left_rowid": df["_rowid"].to_numpy()[l],
+        "left_id": ids.to_numpy()[l],
+        "right_bank": np.asarray(bank_labels)[bank_codes[r]],
+        "right_rowid": df["_rowid"].to_numpy()[r],
+        "right_id": ids.to_numpy()[r],
+        "score": np.round(scores[keep], 4),
+        "status": np.where(scores[keep] >= MATCH_THRESHOLD, "match", "possible"),
+    })
+    links.to_sql(LINK_TABLE, conn, if_exists="append", index=False)
+    conn.commit()
+
+    naive = _naive_pair_count(bank_codes)
+    return {
+        "table": table,
+        "rows": len(df),
+        "fields": fields,
+        "naive_pairs": naive,
+        "candidate_pairs": len(pairs),
+        "reduction_ratio": round(1 - len(pairs) / naive, 6) if naive else 0.0,
+        "matches": int((links["status"] == "match").sum()),
+        "possible_matches": int((links["status"] == "possible").sum()),
+        "seconds": round(elapsed, 3),
+        "pairs_per_second": round(len(pairs) / elapsed) if elapsed else None,
+    }
+
+def run_entity_resolution(db_path: Path = DB_PATH) -> bool:
+    print("[entity_resolution] Starting cross-bank entity resolution...")
+    if not Path(db_path).exists():
+        print(f"[entity_resolution] DB not found: {db_path}")
+        return False
+
+    conn = sqlite3.connect(db_path)
+    report = []
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?", (UNIFIED_PREFIX + "%",)
+        )]
+        removed = prune_links(conn, tables)
+        if removed:
+            print(f"[entity_resolution] Removed {removed} links from tables that no longer exist")
+        for table in tables:
+            stats = resolve_table(conn, table)
+            if stats is None:
+                print(f"[entity_resolution] {table}: no identity columns or single bank; skipping")
+                continue
+            report.append(stats)
+            print(
+                f"[entity_resolution] ✅ {table}: rows={stats['rows']}, candidates={stats['candidate_pairs']} "
+                f"of {stats['naive_pairs']} (reduction {stats['reduction_ratio']:.4%}), "
+                f"matches={stats['matches']}, possible={stats['possible_matches']}, "
+                f"{stats['pairs_per_second']} pairs/s"
+            )
+    finally:
+        conn.close()
+
+    manifest = {
+        "timestamp": datetime.now().isoformat(),
+        "db_path": str(db_path),
+        "link_table": LINK_TABLE,
+        "thresholds": {"match": MATCH_THRESHOLD, "review": REVIEW_THRESHOLD},
+        "tables": report,
+    }
+    Path(MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"[entity_resolution] Manifest: {MANIFEST_FILE}")
+    print("[entity_resolution] Done.")
+    return True
+
+if __name__ == "__main__":
+    run_entity_resolution()
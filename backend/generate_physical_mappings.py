@@ -1,17 +1,17 @@
 import json, re, sqlite3
 from pathlib import Path
 from typing import Dict, List, Optional
+from banks import bank_names, table_prefixes
 
 BASE = Path(__file__).parent
 DB_PATH = BASE / "merged_banks.db"
 TABLE_MAP_FILE = BASE / "schemas" / "table_name_mapping.json"
 FIELD_MAP_FILE = BASE / "schemas" / "bank_column_mapping.json"
+HUB_MAP_FILE = BASE / "schemas" / "hub_mapping.json"
 OUT_FILE = BASE / "Resolved_Mappings.json"
 
 INCLUDE_NEEDS_REVIEW = True  
 USE_SQLITE_IF_PRESENT = True   
-BANKA_PREFIXES = ["BankA", "Bank_A", "banka"]
-BANKB_PREFIXES = ["BankB", "Bank_B", "bankb"]
 
 def norm(s: str) -> str:
     return re.sub(r"[^a-z0-9]+", "_", (s or "").lower()).strip("_")
@@ -42,7 +42,8 @@ def best_prefix_tables(all_tables: List[str], prefixes: List[str]) -> List[str]:
     out = []
     for t in all_tables:
         tn = norm(t)
-        if any(tn.startswith(p + "_") or tn.startswith(p) for p in pn):
+        # Separator required, so bank "Bank1" does not claim "Bank10_*" tables
+        if any(tn == p or tn.startswith(p + "_") for p in pn):
             out.append(t)
     return out
 
@@ -65,75 +66,116 @@ def pick(d: Dict, *keys: str) -> str:
             return v.strip()
     return ""
 
+def load_hub_mapping() -> Dict:
+    """hub_mapping.json (N banks) if present, else the legacy two-bank files in the same shape."""
+    if HUB_MAP_FILE.exists():
+        return load_json(HUB_MAP_FILE)
+    names = bank_names()
+    return {
+        "canonical_bank": names[0],
+        "banks": {names[1]: {
+            "table_mapping": load_json(TABLE_MAP_FILE),
+            "column_mapping": load_json(FIELD_MAP_FILE),
+        }},
+    }
+
+def column_pairs(field_map: Dict, fm_key: str) -> List[Dict]:
+    pairs = field_map.get(fm_key, [])
+    if not isinstance(pairs, list) or not pairs:
+        if isinstance(field_map, dict) and field_map:
+            keys = list(field_map.keys())
+            fm_key2 = max(keys, key=lambda k: score_name(k, fm_key or k))
+            if score_name(fm_key2, fm_key) > 0:
+                pairs = field_map.get(fm_key2, [])
+    return pairs if isinstance(pairs, list) else []
+
 def main():
-    table_map = load_json(TABLE_MAP_FILE)     
-    field_map = load_json(FIELD_MAP_FILE)     
+    hub_map = load_hub_mapping()
+    hub = hub_map["canonical_bank"]
     conn = None
     if USE_SQLITE_IF_PRESENT and DB_PATH.exists():
         conn = sqlite3.connect(DB_PATH)
 
-    out = []
-    produced = 0
+    # Group each bank's table matches under the canonical (hub) logical table
+    logical_tables: Dict[str, Dict[str, str]] = {}
+    for bank, result in hub_map["banks"].items():
+        for row in result.get("table_mapping", []):
+            status = (row.get("status") or "").lower()
+            if not INCLUDE_NEEDS_REVIEW and status != "confident match":
+                continue
 
-    for idx, row in enumerate(table_map, 1):
-        status = (row.get("status") or "").lower()
-        if not INCLUDE_NEEDS_REVIEW and status != "confident match":
-            continue
+            logicalA = pick(row, "best_match_bank1_table", "bank1_table", "Bank1_Table")
+            logicalB = pick(row, "bank2_table", "Bank2_Table")
+            if not logicalA and not logicalB:
+                continue
+            logical_tables.setdefault(logicalA or logicalB, {})[bank] = logicalB or logicalA
 
-        logicalA = pick(row, "best_match_bank1_table", "bank1_table", "Bank1_Table")
-        logicalB = pick(row, "bank2_table", "Bank2_Table")
-        if not logicalA and not logicalB:
-            continue
-        fm_key = logicalA or logicalB
-        pairs = field_map.get(fm_key, [])
-        if not isinstance(pairs, list) or not pairs:
-            if isinstance(field_map, dict) and field_map:
-                keys = list(field_map.keys())
-                fm_key2 = max(keys, key=lambda k: score_name(k, fm_key or k))
-                if score_name(fm_key2, fm_key) > 0:
-                    pairs = field_map.get(fm_key2, [])
-        if not pairs:
+    out = []
+    produced = 0
+    first_bank = next(iter(hub_map["banks"]), None)
+
+    for logical, members in logical_tables.items():
+        pairs_by_bank = {
+            bank: column_pairs(hub_map["banks"][bank].get("column_mapping") or {}, logical)
+            for bank in members
+        }
+        if not any(pairs_by_bank.values()):
             out.append({
-                "logical_table": logicalA or logicalB,
+                "logical_table": logical,
+                "tables": {},
                 "bankA_table": None,
                 "bankB_table": None,
                 "columns": []
             })
             produced += 1
             continue
-        a_tbl = b_tbl = None
-        a_cols = b_cols = []
+
+        tables: Dict[str, Optional[str]] = {hub: None}
+        phys_cols: Dict[str, List[str]] = {}
         if conn is not None:
-            a_tbl = resolve_table(conn, logicalA or logicalB, BANKA_PREFIXES)
-            b_tbl = resolve_table(conn, logicalB or logicalA, BANKB_PREFIXES)
-            if a_tbl: a_cols = table_cols(conn, a_tbl)
-            if b_tbl: b_cols = table_cols(conn, b_tbl)
-
-        resolved_cols = []
-        for p in pairs:
-            b2 = p.get("bank2_column") or {}
-            b1 = p.get("best_match_bank1_column") or {}
-            a_label = (b1.get("label") or "").strip()
-            b_label = (b2.get("label") or "").strip()
-
-            unified = unify(a_label or b_label)
-            typ = (b1.get("type") or b2.get("type") or "string").lower()
-            if typ not in {"string", "float", "date"}:
-                typ = "string"
-            a_phys = snap_label_to_physical(a_label, a_cols) if a_cols else a_label
-            b_phys = snap_label_to_physical(b_label, b_cols) if b_cols else b_label
-
-            resolved_cols.append({
-                "bankA": a_phys or a_label,
-                "bankB": b_phys or b_label,
-                "unified": unified,
-                "type": typ
-            })
+            tables[hub] = resolve_table(conn, logical, table_prefixes(hub))
+            for bank, bank_table in members.items():
+                tables[bank] = resolve_table(conn, bank_table or logical, table_prefixes(bank))
+            phys_cols = {bank: table_cols(conn, t) for bank, t in tables.items() if t}
+
+        # One entry per hub column; every bank that matched it adds its physical column to `sources`
+        resolved: Dict[str, Dict] = {}
+        for bank, pairs in pairs_by_bank.items():
+            for p in pairs:
+                b2 = p.get("bank2_column") or {}
+                b1 = p.get("best_match_bank1_column") or {}
+                a_label = (b1.get("label") or "").strip()
+                b_label = (b2.get("label") or "").strip()
+
+                unified = unify(a_label or b_label)
+                a_cols, b_cols = phys_cols.get(hub), phys_cols.get(bank)
+                b_phys = snap_label_to_physical(b_label, b_cols) if b_cols else b_label
+                entry = resolved.get(unified)
+                if entry is None:
+                    typ = (b1.get("type") or b2.get("type") or "string").lower()
+                    if typ not in {"string", "float", "date"}:
+                        typ = "string"
+                    a_phys = snap_label_to_physical(a_label, a_cols) if a_cols else a_label
+                    entry = resolved[unified] = {
+                        "sources": {hub: a_phys or a_label},
+                        # Legacy two-bank view: canonical side / first bank's side
+                        "bankA": a_phys or a_label,
+                        "bankB": None,
+                        "unified": unified,
+                        "type": typ
+                    }
+                if bank in entry["sources"]:
+                    continue
+                entry["sources"][bank] = b_phys or b_label
+                if bank == first_bank:
+                    entry["bankB"] = b_phys or b_label
+        resolved_cols = list(resolved.values())
 
         out.append({
-            "logical_table": logicalA or logicalB,
-            "bankA_table": a_tbl,
-            "bankB_table": b_tbl,
+            "logical_table": logical,
+            "tables": {bank: t for bank, t in tables.items() if t},
+            "bankA_table": tables.get(hub),
+            "bankB_table": tables.get(first_bank),
             "columns": resolved_cols
         })
         produced += 1
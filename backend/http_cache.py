@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import json
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+from fastapi import Request, Response
+
+GZIP_MIN_BYTES = 1024
+
+class CachedBody(NamedTuple):
+    key: Tuple[int, int]       # (mtime_ns, size) of the source on disk
+    body: bytes                # compact JSON, same bytes FastAPI's JSONResponse would emit
+    gzipped: bytes             # empty when the body is too small to bother compressing
+    etag: str
+    last_modified: str
+    mtime: float
+
+_cache: Dict[str, CachedBody] = {}
+_lock = threading.Lock()
+
+def _serialize(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _build(key: Tuple[int, int], mtime: float, body: bytes) -> CachedBody:
+    return CachedBody(
+        key=key,
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else b"",
+        etag='"' + hashlib.sha1(body).hexdigest() + '"',
+        last_modified=formatdate(mtime, usegmt=True),
+        mtime=mtime,
+    )
+
+def _get(cache_key: str, path: Path, load: Callable[[], Any]) -> CachedBody:
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    entry = _cache.get(cache_key)
+    if entry is not None and entry.key == key:
+        return entry
+    entry = _build(key, st.st_mtime, _serialize(load()))
+    with _lock:
+        _cache[cache_key] = entry
+    return entry
+
+def cached_json_file(path: Path) -> CachedBody:
+    """Parse + serialize a JSON file once per (mtime, size); later calls hit memory."""
+    return _get(f"file:{path}", path, lambda: json.loads(path.read_text(encoding="utf-8")))
+
+def cached_listing(directory: Path, pattern: str, render: Callable[[list], Any]) -> CachedBody:
+    """Cache a directory listing; the dir mtime changes whenever files are added/removed."""
+    return _get(
+        f"dir:{directory}:{pattern}",
+        directory,
+        lambda: render(sorted(directory.glob(pattern))),
+    )
+
+def _not_modified(request: Request, entry: CachedBody) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = {t.strip() for t in inm.split(",")}
+        return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(entry.mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def conditional_response(request: Request, entry: CachedBody) -> Response:
+    """Return 304 for a matching ETag/Last-Modified, else the cached (optionally gzipped) body."""
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": entry.last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    if entry.gzipped and "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzipped, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
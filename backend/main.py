@@ -1,18 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, Request, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi import HTTPException
 import os
 import shutil
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 import json
 import io
 import sys
 from contextlib import redirect_stdout
 from schema_parser import run_schema_parser, parse_schema_workbook, save_schema_json
-from merge_banks import run_merge_banks
-from ai_mapping import run_ai_mapping, auto_map
+from merge_banks import run_merge_banks, ingest_file
+from ai_mapping import run_ai_mapping, auto_map_hub
 from transform_unified import run_transform_unified
+from entity_resolution import run_entity_resolution
+from data_profiling import run_data_profiling
+from conflict_detection import run_conflict_detection, REPORT_FILE as CONFLICT_REPORT_FILE
+import chunked_upload
+import http_cache
+import mapping_index
+import banks
+import unified_query
 
 app = FastAPI()
 app.add_middleware(
@@ -31,20 +41,20 @@ async def run_pipeline():
     """
     log_stream = io.StringIO()
     try:
-        BANK1_FILE = "schemas/bank1__bank1_schema.json"
-        BANK2_FILE = "schemas/bank2__bank2_schema.json"
+        BANK1_FILE, OTHER_BANK_FILES = banks.schema_files("schemas")
         schemas_dir = Path("schemas")
         # Check for required schema files before running pipeline
-        bank1_exists = Path(BANK1_FILE).exists()
-        bank2_exists = Path(BANK2_FILE).exists()
-        if not (bank1_exists and bank2_exists):
+        required = [BANK1_FILE, *OTHER_BANK_FILES.values()]
+        missing = [f for f in required if not Path(f).exists()]
+        if missing:
             existing_files = list(schemas_dir.glob("*.json"))
             existing_files_str = ", ".join([f.name for f in existing_files])
+            checked = ", ".join(f"{f} (exists: {f not in missing})" for f in required)
             error_msg = (
                 f"Required schema files not found.\n"
-                f"Checked for: {BANK1_FILE} (exists: {bank1_exists}), {BANK2_FILE} (exists: {bank2_exists})\n"
+                f"Checked for: {checked}\n"
                 f"Files currently in {schemas_dir}: {existing_files_str if existing_files else '[none]'}\n"
-                f"Please ensure both files are uploaded and parsed with the correct names."
+                f"Please ensure all bank schema files are uploaded and parsed with the correct names."
             )
             return {
                 "success": False,
@@ -61,11 +71,20 @@ async def run_pipeline():
             run_merge_banks()
 
             # 3. AI mapping
-            run_ai_mapping(BANK1_FILE, BANK2_FILE, "schemas")
+            run_ai_mapping(BANK1_FILE, OTHER_BANK_FILES, "schemas")
 
             # 4. Transform unified
             run_transform_unified()
 
+            # 5. Cross-bank entity resolution
+            run_entity_resolution()
+
+            # 6. Profile unified tables (single streaming pass)
+            run_data_profiling()
+
+            # 7. Cross-bank field conflicts on shared keys
+            run_conflict_detection()
+
         logs = log_stream.getvalue()
         return {"success": True, "logs": logs}
     except Exception as e:
@@ -109,36 +128,132 @@ async def parse_schemas(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
 
 
 @app.get("/schemas/list")
-def list_schema_json():
+def list_schema_json(request: Request):
     """List all parsed schema JSON files."""
-    files = sorted(SCHEMA_DIR.glob("*.json"))
-    return {"files": [p.name for p in files]}
+    if not SCHEMA_DIR.exists():
+        return {"files": []}
+    entry = http_cache.cached_listing(SCHEMA_DIR, "*.json", lambda files: {"files": [p.name for p in files]})
+    return http_cache.conditional_response(request, entry)
 
 
 @app.get("/schemas/{name}")
-def read_schema_json(name: str):
-    """Return the contents of a specific parsed schema JSON file."""
+def read_schema_json(name: str, request: Request):
+    """Return the contents of a specific parsed schema JSON file (cached by mtime, ETag-aware)."""
     path = SCHEMA_DIR / name
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"{name} not found")
-    return json.loads(path.read_text(encoding="utf-8"))
-
-# app.py
-from ai_mapping import auto_map
-
-# File paths
-BANK1_FILE = "backend/schemas/bank1__bank1_schema.json"
-BANK2_FILE = "backend/schemas/bank2__bank2_schema.json"
+    return http_cache.conditional_response(request, http_cache.cached_json_file(path))
 
 @app.get("/auto-map")
 def run_auto_mapping():
-    result = auto_map(BANK1_FILE, BANK2_FILE, "backend/schemas")
+    # Hub schema + every other configured bank (see banks.py)
+    hub_file, other_files = banks.schema_files("backend/schemas")
+    result = auto_map_hub(hub_file, other_files, "backend/schemas")
     return result
 
+def _mapping_bank(bank: Optional[str]) -> Optional[str]:
+    if not bank:
+        return None
+    resolved = banks.resolve_bank(bank)
+    if not resolved:
+        raise HTTPException(status_code=400, detail=f"Invalid bank name: {bank}")
+    return resolved
+
+@app.get("/mappings/tables")
+def list_table_mappings(
+    bank: Optional[str] = None,
+    status: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=mapping_index.MAX_PAGE_SIZE),
+):
+    """Page through every bank's saved table matches without re-running the model."""
+    if not mapping_index.has_results(SCHEMA_DIR):
+        raise HTTPException(status_code=404, detail="No saved table mapping; run /auto-map first")
+    return mapping_index.query_table_matches(
+        SCHEMA_DIR, status, min_confidence, max_confidence, page, page_size, _mapping_bank(bank)
+    )
+
+@app.get("/mappings/columns")
+def list_column_mappings(
+    table: Optional[List[str]] = Query(None),
+    bank: Optional[str] = None,
+    status: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=mapping_index.MAX_PAGE_SIZE),
+):
+    """
+    Page through every bank's saved column matches, e.g.
+    /mappings/columns?bank=BankC&table=Customer&status=Needs%20Review&max_confidence=60
+    """
+    if not mapping_index.has_results(SCHEMA_DIR):
+        raise HTTPException(status_code=404, detail="No saved column mapping; run /auto-map first")
+    return mapping_index.query_column_matches(
+        SCHEMA_DIR, table, status, min_confidence, max_confidence, page, page_size, _mapping_bank(bank)
+    )
+
+@app.get("/conflicts")
+def read_conflict_report(request: Request):
+    """Per-column conflict counts and samples from the last conflict-detection run."""
+    if not CONFLICT_REPORT_FILE.exists():
+        raise HTTPException(status_code=404, detail="No conflict report; run the pipeline first")
+    return http_cache.conditional_response(request, http_cache.cached_json_file(CONFLICT_REPORT_FILE))
+
+# --- Unified tables: keyset-paginated reads and streaming exports ---
+
+UNIFIED_RESERVED_PARAMS = {"limit", "cursor", "order_by", "format"}
+
+def _unified_filters(request: Request) -> Dict[str, str]:
+    # Any other query parameter is an equality filter, e.g. ?bank_origin=BankA
+    return {k: v for k, v in request.query_params.items() if k not in UNIFIED_RESERVED_PARAMS}
+
+@app.get("/unified/tables")
+async def list_unified_tables():
+    return await asyncio.to_thread(unified_query.describe_tables)
+
+@app.get("/unified/{table}")
+async def read_unified_table(
+    table: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=unified_query.MAX_PAGE),
+    cursor: Optional[str] = None,
+    order_by: Optional[str] = None,
+):
+    """
+    One page of a Unified_* table; pass the returned next_cursor to continue, e.g.
+    /unified/Unified_Customer?order_by=customerId&bank_origin=BankB&limit=500
+    """
+    try:
+        return await asyncio.to_thread(
+            unified_query.fetch_page, table, limit, cursor, order_by, _unified_filters(request)
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"{table} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/unified/{table}/export")
+async def export_unified_table(table: str, request: Request, format: str = Query("csv")):
+    """Stream the whole table (optionally filtered) as csv, xlsx or parquet."""
+    try:
+        body = await asyncio.to_thread(unified_query.export_table, table, format, _unified_filters(request))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"{table} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type = unified_query.EXPORT_FORMATS[format][0]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
 @app.post("/upload")
 async def upload_file(bank: str = Form(...), file: UploadFile = File(...)):
-    bank_map = {"a": "BankA", "b": "BankB", "banka": "BankA", "bankb": "BankB"}
-    bank_folder = bank_map.get(bank.lower())
+    bank_folder = banks.resolve_bank(bank)
     if not bank_folder:
         return {"error": f"Invalid bank name: {bank}"}
 
@@ -149,12 +264,76 @@ async def upload_file(bank: str = Form(...), file: UploadFile = File(...)):
 
     file_path = upload_dir / file.filename
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Copy in a worker thread so large files don't block the event loop
+    def _copy():
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+    await asyncio.to_thread(_copy)
 
     print(f"✅ File saved to: {file_path}")
     return {"message": f"File uploaded successfully to {upload_dir}", "filename": file.filename}
 
+# --- Resumable chunked uploads: init → PUT chunks at offsets → finalize ---
+
+@app.post("/upload/init")
+async def upload_init(
+    bank: str = Form(...),
+    filename: str = Form(...),
+    total_size: Optional[int] = Form(None),
+):
+    """Open an upload session; returns the upload_id used by the chunk endpoints."""
+    bank_folder = banks.resolve_bank(bank)
+    if not bank_folder:
+        raise HTTPException(status_code=400, detail=f"Invalid bank name: {bank}")
+    return await asyncio.to_thread(chunked_upload.init_upload, bank_folder, filename, total_size)
+
+@app.get("/upload/{upload_id}")
+async def upload_status(upload_id: str):
+    """Return the last confirmed offset so a client can resume after a dropped connection."""
+    try:
+        return await asyncio.to_thread(chunked_upload.get_upload, upload_id)
+    except chunked_upload.UploadNotFound:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+
+@app.put("/upload/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Append the raw request body at `offset` (must equal the confirmed offset)."""
+    try:
+        return await chunked_upload.append_chunk(upload_id, offset, request.stream())
+    except chunked_upload.UploadNotFound:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    except chunked_upload.OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "offset": e.expected})
+    except chunked_upload.SizeExceeded as e:
+        raise HTTPException(status_code=413, detail={"error": str(e), "offset": e.confirmed})
+
+@app.post("/upload/{upload_id}/finalize")
+async def upload_finalize(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    sha256: Optional[str] = Form(None),
+    ingest: bool = Form(False),
+):
+    """
+    Verify size and (optionally) sha256, move the file into BankX/uploads and,
+    if `ingest` is set, load just that file into merged_banks.db in the background.
+    """
+    try:
+        meta = await asyncio.to_thread(chunked_upload.get_upload, upload_id)
+        file_path = await chunked_upload.finalize_upload(upload_id, sha256)
+    except chunked_upload.UploadNotFound:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    except chunked_upload.ChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if ingest:
+        background_tasks.add_task(ingest_file, meta["bank"], file_path)
+    return {
+        "message": f"File uploaded successfully to {file_path.parent}",
+        "filename": file_path.name,
+        "ingesting": ingest,
+    }
+
 from fastapi import WebSocket
 import asyncio
 
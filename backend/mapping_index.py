@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from banks import bank_names
+
+INDEX_FILE = "mapping_index.db"
+# Every bank's results; the two legacy files (first bank only) are read when it is missing
+HUB_MAP_FILE = "hub_mapping.json"
+TABLE_MAP_FILE = "table_name_mapping.json"
+COLUMN_MAP_FILE = "bank_column_mapping.json"
+MAX_PAGE_SIZE = 500
+
+# Reads rebuild a stale index from FastAPI's threadpool; one rebuild at a time per process
+_rebuild_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE table_matches (
+    id INTEGER PRIMARY KEY,
+    bank TEXT,
+    bank2_table TEXT,
+    bank1_table TEXT,
+    confidence REAL,
+    status TEXT,
+    payload TEXT
+);
+CREATE TABLE column_matches (
+    id INTEGER PRIMARY KEY,
+    bank TEXT,
+    table_name TEXT,
+    bank2_label TEXT,
+    bank1_label TEXT,
+    confidence REAL,
+    status TEXT,
+    payload TEXT
+);
+CREATE INDEX ix_tm_status ON table_matches (status, confidence);
+CREATE INDEX ix_cm_table ON column_matches (table_name, confidence);
+CREATE INDEX ix_cm_status ON column_matches (status, confidence);
+CREATE INDEX ix_tm_bank ON table_matches (bank, confidence);
+CREATE INDEX ix_cm_bank ON column_matches (bank, table_name);
+"""
+
+def _source_stamp(folder: Path) -> str:
+    parts = []
+    for name in (HUB_MAP_FILE, TABLE_MAP_FILE, COLUMN_MAP_FILE):
+        p = folder / name
+        parts.append(f"{name}:{p.stat().st_mtime_ns}" if p.exists() else f"{name}:-")
+    return "|".join(parts)
+
+def _load(path: Path, default):
+    if not path.exists():
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def has_results(save_folder) -> bool:
+    folder = Path(save_folder)
+    return (folder / HUB_MAP_FILE).exists() or (folder / TABLE_MAP_FILE).exists()
+
+def _load_results(folder: Path) -> Dict[str, Dict[str, Any]]:
+    """{bank: {"table_mapping": [...], "column_mapping": {...}}} from hub_mapping.json or the legacy files."""
+    hub = _load(folder / HUB_MAP_FILE, None)
+    if hub is not None:
+        return hub.get("banks", {})
+    names = bank_names()
+    return {names[1] if len(names) > 1 else None: {
+        "table_mapping": _load(folder / TABLE_MAP_FILE, []),
+        "column_mapping": _load(folder / COLUMN_MAP_FILE, {}),
+    }}
+
+def build_mapping_index(save_folder) -> Path:
+    """(Re)build the SQLite index over the saved mapping JSON files."""
+    folder = Path(save_folder)
+    results = _load_results(folder)
+
+    out_path = folder / INDEX_FILE
+    fd, tmp_name = tempfile.mkstemp(dir=folder, prefix=INDEX_FILE + ".", suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        conn.executemany(
+            "INSERT INTO table_matches (bank, bank2_table, bank1_table, confidence, status, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    bank,
+                    row.get("bank2_table"),
+                    row.get("best_match_bank1_table"),
+                    row.get("confidence_rating"),
+                    row.get("status"),
+                    json.dumps(row, ensure_ascii=False),
+                )
+                for bank, result in results.items()
+                for row in result.get("table_mapping") or []
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO column_matches (bank, table_name, bank2_label, bank1_label, confidence, status, payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    bank,
+                    table_name,
+                    (row.get("bank2_column") or {}).get("label"),
+                    (row.get("best_match_bank1_column") or {}).get("label"),
+                    row.get("confidence_rating"),
+                    row.get("status"),
+                    json.dumps(row, ensure_ascii=False),
+                )
+                for bank, result in results.items()
+                for table_name, rows in (result.get("column_mapping") or {}).items()
+                for row in rows
+            ],
+        )
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (_source_stamp(folder),))
+        conn.commit()
+    except BaseException:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp_path, out_path)
+    print(f"[mapping_index] Indexed {sum(len(r.get('table_mapping') or []) for r in results.values())} table and "
+          f"{sum(len(v) for r in results.values() for v in (r.get('column_mapping') or {}).values())} "
+          f"column matches for {len(results)} bank(s) → {out_path}")
+    return out_path
+
+def _open_current(folder: Path) -> Optional[sqlite3.Connection]:
+    """The index if it was built from the JSON outputs as they are now, else None."""
+    path = folder / INDEX_FILE
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(path)
+    row = conn.execute("SELECT value FROM meta WHERE key='source'").fetchone()
+    if row and row[0] == _source_stamp(folder):
+        return conn
+    conn.close()
+    return None
+
+def _connect(save_folder) -> sqlite3.Connection:
+    """Open the index, rebuilding it if the JSON outputs changed since it was built."""
+    folder = Path(save_folder)
+    conn = _open_current(folder)
+    if conn is not None:
+        return conn
+    with _rebuild_lock:
+        # Another request may have rebuilt it while this one waited
+        conn = _open_current(folder)
+        if conn is None:
+            build_mapping_index(folder)
+            conn = sqlite3.connect(folder / INDEX_FILE)
+    return conn
+
+def _filters(bank: Optional[str], status: Optional[str], min_conf: Optional[float], max_conf: Optional[float]):
+    where, args = [], []
+    if bank:
+        where.append("bank = ?")
+        args.append(bank)
+    if status:
+        where.append("status = ?")
+        args.append(status)
+    if min_conf is not None:
+        where.append("confidence >= ?")
+        args.append(min_conf)
+    if max_conf is not None:
+        where.append("confidence <= ?")
+        args.append(max_conf)
+    return where, args
+
+def _page(conn, table: str, select: str, where: List[str], args: List[Any], page: int, page_size: int):
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    total = conn.execute(f"SELECT COUNT(*) FROM {table}{clause}", args).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT {select} FROM {table}{clause} ORDER BY id LIMIT ? OFFSET ?",
+        args + [page_size, (page - 1) * page_size],
+    ).fetchall()
+    return {"total": total, "page": page, "page_size": page_size}, rows
+
+def query_table_matches(save_folder, status=None, min_conf=None, max_conf=None, page=1, page_size=50,
+                        bank=None) -> Dict[str, Any]:
+    """One page of table matches, filtered by bank/status/confidence; each item is tagged with its bank."""
+    conn = _connect(save_folder)
+    try:
+        where, args = _filters(bank, status, min_conf, max_conf)
+        result, rows = _page(conn, "table_matches", "bank, payload", where, args, page, page_size)
+        result["items"] = [{"bank": b, **json.loads(payload)} for b, payload in rows]
+        return result
+    finally:
+        conn.close()
+
+def query_column_matches(save_folder, tables=None, status=None, min_conf=None, max_conf=None,
+                         page=1, page_size=50, bank=None) -> Dict[str, Any]:
+    """One page of column matches; each item is tagged with its bank and table."""
+    conn = _connect(save_folder)
+    try:
+        where, args = _filters(bank, status, min_conf, max_conf)
+        if tables:
+            where.insert(0, f"table_name IN ({', '.join('?' for _ in tables)})")
+            args = list(tables) + args
+        result, rows = _page(conn, "column_matches", "bank, table_name, payload", where, args, page, page_size)
+        result["items"] = [{"bank": b, "table": table_name, **json.loads(payload)} for b, table_name, payload in rows]
+        return result
+    finally:
+        conn.close()
@@ -0,0 +1,113 @@
+"""
+Persisted similarity state for ai_mapping, so a schema edit only re-scores
+what it touched. For every bank, each table pair keeps its score matrices
+(bank columns x hub columns) keyed by column fingerprints plus the column
+each row picked last time; the embeddings of every text seen are kept
+alongside. On the next run cells whose row and column fingerprints are
+both known are copied, and only new or edited rows/columns are computed.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+STATE_FILE = "similarity_state_{bank}.npz"
+EMBEDDINGS_FILE = "similarity_embeddings.npz"
+TABLES_KEY = "__tables__"
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+# --- Files ---
+
+def load_state(save_folder: str, bank: str, settings: str) -> Dict[str, Dict]:
+    """{pair: {"rows", "cols", "picks", "<matrix>": ndarray}}; empty if missing or built with other settings."""
+    path = os.path.join(save_folder, STATE_FILE.format(bank=bank))
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("settings") != settings:
+            print(f"[ai_mapping] Similarity state for {bank} was built with other settings; recomputing")
+            return {}
+        pairs = meta["pairs"]
+        for i, pair in enumerate(pairs.values()):
+            for name in pair.pop("matrices"):
+                pair[name] = data[f"{i}/{name}"]
+    return pairs
+
+def save_state(save_folder: str, bank: str, settings: str, pairs: Dict[str, Dict]) -> None:
+    arrays, meta = {}, {}
+    for i, (key, pair) in enumerate(pairs.items()):
+        names = [k for k, v in pair.items() if isinstance(v, np.ndarray)]
+        meta[key] = {k: v for k, v in pair.items() if k not in names}
+        meta[key]["matrices"] = names
+        arrays.update({f"{i}/{name}": pair[name] for name in names})
+    path = os.path.join(save_folder, STATE_FILE.format(bank=bank))
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, meta=np.array(json.dumps({"settings": settings, "pairs": meta})), **arrays)
+    os.replace(tmp, path)
+
+def load_embeddings(save_folder: str, settings: str) -> Dict[str, np.ndarray]:
+    path = os.path.join(save_folder, EMBEDDINGS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as data:
+        if str(data["settings"]) != settings:
+            return {}
+        return dict(zip(data["texts"].tolist(), data["vectors"]))
+
+def save_embeddings(save_folder: str, settings: str, embeddings: Dict[str, np.ndarray]) -> None:
+    if not embeddings:
+        return
+    path = os.path.join(save_folder, EMBEDDINGS_FILE)
+    tmp = path + ".tmp.npz"
+    texts = list(embeddings)
+    np.savez_compressed(tmp, settings=np.array(settings), texts=np.array(texts),
+                        vectors=np.stack([embeddings[t] for t in texts]))
+    os.replace(tmp, path)
+
+# --- Matrix reuse ---
+
+def _first_index(fps: List[str]) -> Dict[str, int]:
+    out = {}
+    for i, fp in enumerate(fps):
+        out.setdefault(fp, i)
+    return out
+
+def reuse(prev: Optional[Dict], name: str, rows: List[str], cols: List[str], fill) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Matrix `name` for (rows x cols) filled from `prev` where both fingerprints
+    were seen before; returns it with the indices of new rows and new columns.
+    """
+    dtype = np.asarray(fill).dtype
+    out = np.full((len(rows), len(cols)), fill, dtype=dtype)
+    if not prev or name not in prev:
+        return out, np.arange(len(rows)), np.arange(len(cols))
+    old_rows, old_cols = _first_index(prev["rows"]), _first_index(prev["cols"])
+    r_new = [i for i, fp in enumerate(rows) if fp in old_rows]
+    c_new = [j for j, fp in enumerate(cols) if fp in old_cols]
+    if r_new and c_new:
+        r_old = [old_rows[rows[i]] for i in r_new]
+        c_old = [old_cols[cols[j]] for j in c_new]
+        out[np.ix_(r_new, c_new)] = prev[name][np.ix_(r_old, c_old)]
+    missing_rows = np.setdiff1d(np.arange(len(rows)), r_new)
+    missing_cols = np.setdiff1d(np.arange(len(cols)), c_new)
+    return out, missing_rows, missing_cols
+
+def previous_pick(prev: Optional[Dict], row_fp: str) -> Optional[str]:
+    """Fingerprint of the column this row matched last run (None if the row is new)."""
+    if not prev:
+        return None
+    i = _first_index(prev["rows"]).get(row_fp)
+    return prev["picks"][i] if i is not None else None
+
+def keep_saved(saved: Optional[Dict], target_exists: bool, unchanged: bool) -> bool:
+    """
+    Keep last run's (possibly hand-edited) result when its target still
+    exists and either the match would come out the same or it was marked
+    "reviewed": true.
+    """
+    return bool(saved) and target_exists and (unchanged or bool(saved.get("reviewed")))
@@ -3,17 +3,79 @@ import sqlite3
 import json
 from pathlib import Path
 from datetime import datetime
+from banks import bank_names
+from content_signatures import build_table_signatures, load_signatures, save_signatures
+from dtype_optimizer import optimize_dtypes, origin_column
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / "merged_banks.db"
 
 def normalize_name(name: str) -> str:
     """Replace spaces, slashes, and hyphens with underscores."""
     return name.strip().replace(" ", "_").replace("-", "_").replace("/", "_")
 
+def compact_frame(df, bank_name, table_name, memory=None):
+    """Add bank_origin and shrink dtypes; records {"before", "after"} bytes in `memory`."""
+    df["bank_origin"] = origin_column(bank_name, len(df))
+    df, usage = optimize_dtypes(df, skip=["bank_origin"])
+    if memory is not None:
+        memory[table_name] = usage
+    return df
+
+def load_file(conn, bank_name, file, signatures=None, memory=None):
+    """
+    Load one uploaded CSV/Excel file into SQLite; returns the table names written.
+    If `signatures` is given, per-column content signatures are added to it
+    while each frame is still in memory; `memory` collects per-table frame
+    sizes before/after dtype compaction.
+    """
+    tables_added = []
+    if file.suffix.lower() in [".xlsx", ".xls"]:
+        xls = pd.ExcelFile(file)
+        for sheet in xls.sheet_names:
+            df = pd.read_excel(xls, sheet_name=sheet)
+            table_name = f"{bank_name}_{normalize_name(file.stem)}_{normalize_name(sheet)}"
+            df = compact_frame(df, bank_name, table_name, memory)
+            df.to_sql(table_name, conn, if_exists="replace", index=False)
+            tables_added.append(table_name)
+            if signatures is not None:
+                signatures[table_name] = build_table_signatures(df)
+            print(f"[merge_banks] Loaded sheet '{sheet}' from '{file.name}' as table '{table_name}' ({len(df)} rows)")
+    elif file.suffix.lower() == ".csv":
+        df = pd.read_csv(file)
+        table_name = f"{bank_name}_{normalize_name(file.stem)}"
+        df = compact_frame(df, bank_name, table_name, memory)
+        df.to_sql(table_name, conn, if_exists="replace", index=False)
+        tables_added.append(table_name)
+        if signatures is not None:
+            signatures[table_name] = build_table_signatures(df)
+        print(f"[merge_banks] Loaded CSV '{file.name}' as table '{table_name}' ({len(df)} rows)")
+    else:
+        print(f"[merge_banks] Skipping unsupported file type: {file.name}")
+    return tables_added
+
+def ingest_file(bank_name, file_path, db_path=DB_PATH):
+    """Incrementally (re)load a single uploaded file without touching other tables."""
+    file_path = Path(file_path)
+    print(f"[merge_banks] Ingesting {file_path.name} for {bank_name}...")
+    conn = sqlite3.connect(db_path)
+    signatures = {}
+    try:
+        tables = load_file(conn, bank_name, file_path, signatures)
+    except Exception as e:
+        print(f"[merge_banks] Failed to load {file_path.name}: {e}")
+        tables = []
+    finally:
+        conn.close()
+    if signatures:
+        store = load_signatures()
+        store.setdefault(bank_name, {}).update(signatures)
+        save_signatures(store)
+    print(f"[merge_banks] Ingest of {file_path.name} done ({len(tables)} table(s)).")
+    return tables
+
 def run_merge_banks():
     print("[merge_banks] Starting merge...")
-    BASE_DIR = Path(__file__).parent
-    BANK_A_DIR = BASE_DIR / "BankA/uploads"
-    BANK_B_DIR = BASE_DIR / "BankB/uploads"
-    DB_PATH = BASE_DIR / "merged_banks.db"
     MAPPING_FILE = BASE_DIR / "schemas/table_name_mapping.json"
     MANIFEST_FILE = BASE_DIR / "mansifest.json"
 
@@ -33,6 +95,8 @@ def run_merge_banks():
     }
 
     conn = sqlite3.connect(DB_PATH)
+    signatures = {}
+    memory = {}
 
     def load_bank_data(bank_name, input_dir):
         tables_added = []
@@ -41,46 +105,26 @@ def run_merge_banks():
             return tables_added
         for file in input_dir.glob("*"):
             try:
-                if file.suffix.lower() in [".xlsx", ".xls"]:
-                    xls = pd.ExcelFile(file)
-                    for sheet in xls.sheet_names:
-                        df = pd.read_excel(file, sheet_name=sheet)
-                        df["bank_origin"] = bank_name
-                        table_name = f"{bank_name}_{normalize_name(file.stem)}_{normalize_name(sheet)}"
-                        df.to_sql(table_name, conn, if_exists="replace", index=False)
-                        tables_added.append(table_name)
-                        print(f"[merge_banks] Loaded sheet '{sheet}' from '{file.name}' as table '{table_name}' ({len(df)} rows)")
-                elif file.suffix.lower() == ".csv":
-                    df = pd.read_csv(file)
-                    df["bank_origin"] = bank_name
-                    table_name = f"{bank_name}_{normalize_name(file.stem)}"
-                    df.to_sql(table_name, conn, if_exists="replace", index=False)
-                    tables_added.append(table_name)
-                    print(f"[merge_banks] Loaded CSV '{file.name}' as table '{table_name}' ({len(df)} rows)")
-                else:
-                    print(f"[merge_banks] Skipping unsupported file type: {file.name}")
+                tables_added.extend(load_file(conn, bank_name, file, signatures.setdefault(bank_name, {}), memory))
             except Exception as e:
                 print(f"[merge_banks] Failed to load {file.name}: {e}")
         return tables_added
 
-    print("[merge_banks] Loading BankA data...")
-    bankA_tables = load_bank_data("BankA", BANK_A_DIR)
-    print("[merge_banks] Loading BankB data...")
-    bankB_tables = load_bank_data("BankB", BANK_B_DIR)
-
-    manifest["banks_loaded"].append({
-        "bank_name": "BankA",
-        "tables_added": bankA_tables,
-        "total_tables": len(bankA_tables)
-    })
-    manifest["banks_loaded"].append({
-        "bank_name": "BankB",
-        "tables_added": bankB_tables,
-        "total_tables": len(bankB_tables)
-    })
+    for bank_name in bank_names():
+        print(f"[merge_banks] Loading {bank_name} data...")
+        tables = load_bank_data(bank_name, BASE_DIR / bank_name / "uploads")
+        manifest["banks_loaded"].append({
+            "bank_name": bank_name,
+            "tables_added": tables,
+            "total_tables": len(tables),
+            "memory_bytes": {t: memory[t] for t in tables if t in memory}
+        })
 
     # (Optional: merging logic can be added here)
 
+    save_signatures(signatures)
+    print(f"[merge_banks] Column content signatures saved")
+
     with open(MANIFEST_FILE, "w") as f:
         json.dump(manifest, f, indent=2)
 
@@ -91,4 +135,4 @@ def run_merge_banks():
     return True
 
 if __name__ == "__main__":
-    run_merge_banks()
\ No newline at end of file
+    run_merge_banks()
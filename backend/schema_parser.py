@@ -3,6 +3,7 @@ import json
 import re
 from pathlib import Path
 from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
 
 # --- Helper functions ---
@@ -49,24 +50,121 @@ def _enhance_description(desc: str, label: str) -> str:
         return _sentence_case(f"{base} — {hint}.")
     return _sentence_case(f"{base} information.")
 
+# --- Vectorized (column-wise) equivalents of the helpers above ---
+
+HEADER_SCAN_ROWS = 200
+
+_WS = re.compile(r"\s+")
+_ENDS_PUNCT = re.compile(r"[.!?]\Z")
+_HEADER_HINT = re.compile(r"name|desc")
+_HINTS = [
+    ("identifier", re.compile(r"id|key|code")),   # "identifier" contains "id"
+    ("date", re.compile(r"date|time")),
+    ("amount", re.compile(r"amount|balance|rate|value|price")),
+]
+
+def _norm_series(s: pd.Series) -> pd.Series:
+    # Same as _norm: str(v or "") keeps NaN as "nan" and maps 0/None/"" to ""
+    return s.map(lambda v: str(v or "")).str.replace(_WS, " ", regex=True).str.strip()
+
+def _sentence_case_series(s: pd.Series) -> pd.Series:
+    """Column-wise _sentence_case for already-normalized strings."""
+    ends = s.str.contains(_ENDS_PUNCT, regex=True)
+    first = s.str[0]
+    text = first.str.upper() + s.str[1:]
+    text = text.where(~((text.str.len() > 12) & ~ends), text + ".")
+    out = s.where(first.str.isupper() & ends, text)
+    return out.where(s != "", "")
+
+def _enhance_descriptions(desc: pd.Series, label: pd.Series) -> pd.Series:
+    """Batched _enhance_description over normalized description/label columns."""
+    lw = label.str.lower()
+    hint = pd.Series(
+        np.select([lw.str.contains(p, regex=True) for _, p in _HINTS], [h for h, _ in _HINTS], default=""),
+        index=label.index,
+    )
+    base = label.where(label != "", "Field")
+    generated = (base + " — " + hint + ".").where(hint != "", base + " information.")
+    return _sentence_case_series(desc.where(desc.str.len() >= 8, generated))
+
+def _find_header_row(df_raw: pd.DataFrame) -> Optional[Any]:
+    """Index label of the first row with a cell mentioning "name" or "desc"."""
+    hit = pd.Series(False, index=df_raw.index)
+    for c in df_raw.columns:
+        hit |= df_raw[c].map(str).str.lower().str.contains(_HEADER_HINT, regex=True)
+    return hit.idxmax() if hit.any() else None
+
 # --- Core parsing ---
 
+def _pick_columns(columns) -> tuple:
+    name_col = None
+    desc_col = None
+    for c in columns:
+        if any(k in c for k in ["name", "field", "column"]) and not name_col:
+            name_col = c
+        elif any(k in c for k in ["desc", "notes", "details"]) and not desc_col:
+            desc_col = c
+    return name_col, desc_col
+
 def parse_schema_workbook(file_bytes: bytes, filename: str) -> Dict[str, Any]:
     """Parse a schema Excel workbook into a simple label-description JSON."""
-    sheets = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None, header=None)
+    xls = pd.ExcelFile(io.BytesIO(file_bytes))
 
     # Try to guess bank name from filename
     bank_guess = _norm(Path(filename).stem).split("_")[0]
 
     out: Dict[str, Any] = {"bank": bank_guess or "UnknownBank", "tables": {}}
 
+    for sheet_name in xls.sheet_names:
+        # Headers sit near the top: scan a short prefix first so the sheet is
+        # only parsed in full once (with the detected header row)
+        df_raw = xls.parse(sheet_name=sheet_name, header=None, nrows=HEADER_SCAN_ROWS).dropna(how="all")
+        header_row = _find_header_row(df_raw) if not df_raw.empty else None
+        if header_row is None:
+            df_raw = xls.parse(sheet_name=sheet_name, header=None).dropna(how="all")
+            header_row = _find_header_row(df_raw) if not df_raw.empty else None
+
+        if header_row is None:
+            continue
+
+        # Re-read with the detected header row (workbook is already open)
+        df = xls.parse(sheet_name=sheet_name, header=header_row)
+        df = df.dropna(how="all")
+        df.columns = [str(c).strip().lower() for c in df.columns]
+
+        name_col, desc_col = _pick_columns(df.columns)
+        if not name_col:
+            continue
+
+        labels = _norm_series(df[name_col])
+        descs = _norm_series(df[desc_col]) if desc_col else pd.Series("", index=df.index)
+        keep = (labels != "") & ~labels.str.lower().isin(["name", "field"])
+        labels, descs = labels[keep], descs[keep]
+
+        rows: List[Dict[str, Any]] = [
+            {"label": label, "description": description}
+            for label, description in zip(labels.tolist(), _enhance_descriptions(descs, labels).tolist())
+        ]
+
+        if rows:
+            out["tables"][sheet_name] = rows
+
+    return out
+
+
+def parse_schema_workbook_rowwise(file_bytes: bytes, filename: str) -> Dict[str, Any]:
+    """Original row-by-row parser; kept as the reference for parse_schema_workbook."""
+    sheets = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None, header=None)
+
+    bank_guess = _norm(Path(filename).stem).split("_")[0]
+
+    out: Dict[str, Any] = {"bank": bank_guess or "UnknownBank", "tables": {}}
+
     for sheet_name, df_raw in sheets.items():
-        # Drop empty rows
         df_raw = df_raw.dropna(how="all")
         if df_raw.empty:
             continue
 
-        # Find the header row that contains "name" or "description"
         header_row = None
         for i, row in df_raw.iterrows():
             vals = [str(v).lower() for v in row.values if str(v).strip()]
@@ -77,20 +175,11 @@ def parse_schema_workbook(file_bytes: bytes, filename: str) -> Dict[str, Any]:
         if header_row is None:
             continue
 
-        # Re-read with the detected header row
         df = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name, header=header_row)
         df = df.dropna(how="all")
         df.columns = [str(c).strip().lower() for c in df.columns]
 
-        # Identify name and description columns
-        name_col = None
-        desc_col = None
-        for c in df.columns:
-            if any(k in c for k in ["name", "field", "column"]) and not name_col:
-                name_col = c
-            elif any(k in c for k in ["desc", "notes", "details"]) and not desc_col:
-                desc_col = c
-
+        name_col, desc_col = _pick_columns(df.columns)
         if not name_col:
             continue
 
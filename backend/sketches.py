@@ -0,0 +1,200 @@
+"""
+Mergeable streaming sketches used by the profiling stage. Each sketch is fed
+pandas chunks, can be merged with another sketch of the same kind, and
+round-trips through plain JSON so profile state can be stored and updated
+incrementally.
+"""
+import base64
+import math
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+def as_keys(s: pd.Series) -> np.ndarray:
+    """Stable string form of non-null values (1 and 1.0 hash alike across chunks)."""
+    s = s.dropna()
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        if len(s) and bool((s % 1 == 0).all()):
+            s = s.astype("int64")
+        elif pd.api.types.is_float_dtype(s):
+            s = s.astype("float64")   # float32 columns print like their float64 source
+    return s.astype(str).to_numpy(dtype=object)
+
+def hash64(keys: np.ndarray) -> np.ndarray:
+    return pd.util.hash_array(keys) if len(keys) else np.empty(0, dtype=np.uint64)
+
+
+class HyperLogLog:
+    """Distinct-count estimate; registers merge by element-wise max."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_hashes(self, h: np.ndarray) -> None:
+        if not len(h):
+            return
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rest < 2**52 for p >= 12, so float64 log2 is exact here
+        width = 64 - self.p
+        rank = np.where(rest == 0, width + 1, width - np.floor(np.log2(np.maximum(rest, 1).astype(np.float64))))
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def update(self, s: pd.Series) -> None:
+        self.update_hashes(hash64(as_keys(s)))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        out = HyperLogLog(self.p)
+        out.registers = np.maximum(self.registers, other.registers)
+        return out
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return float(raw)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "HyperLogLog":
+        out = cls(d["p"])
+        out.registers = np.frombuffer(base64.b64decode(d["registers"]), dtype=np.uint8).copy()
+        return out
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters. Counts are upper bounds and `floor` bounds the count
+    of anything not tracked. Chunks are summarized with value_counts and merged using the
+    mergeable-summaries rule (absent keys inherit the other side's minimum).
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.floor = 0   # upper bound on the count of any key not tracked
+
+    def _absorb(self, counts: Dict[str, int], floor: int) -> None:
+        merged = {}
+        for k in self.counts.keys() | counts.keys():
+            merged[k] = self.counts.get(k, self.floor) + counts.get(k, floor)
+        top = sorted(merged.items(), key=lambda kv: kv[1], reverse=True)
+        self.counts = dict(top[:self.capacity])
+        dropped = top[self.capacity][1] if len(top) > self.capacity else 0
+        self.floor = max(self.floor + floor, dropped)
+
+    def update(self, s: pd.Series) -> None:
+        vc = pd.Series(as_keys(s)).value_counts()
+        if vc.empty:
+            return
+        head = vc.iloc[:self.capacity]
+        floor = int(vc.iloc[self.capacity]) if len(vc) > self.capacity else 0
+        self._absorb({str(k): int(v) for k, v in head.items()}, floor)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        out = SpaceSaving(self.capacity)
+        out.counts, out.floor = dict(self.counts), self.floor
+        out._absorb(other.counts, other.floor)
+        return out
+
+    def top(self, k: int = 10) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "counts": self.counts, "floor": self.floor}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "SpaceSaving":
+        out = cls(d["capacity"])
+        out.counts, out.floor = dict(d["counts"]), d["floor"]
+        return out
+
+
+class QuantileSketch:
+    """Log-bucketed quantiles (DDSketch-style) with `rel_accuracy` relative error."""
+
+    def __init__(self, rel_accuracy: float = 0.01):
+        self.rel_accuracy = rel_accuracy
+        self.gamma = (1 + rel_accuracy) / (1 - rel_accuracy)
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def _bucket(self, store: Dict[int, int], x: np.ndarray) -> None:
+        if not len(x):
+            return
+        idx, cnt = np.unique(np.ceil(np.log(x) / math.log(self.gamma)).astype(np.int64), return_counts=True)
+        for i, c in zip(idx.tolist(), cnt.tolist()):
+            store[i] = store.get(i, 0) + c
+
+    def update(self, s: pd.Series) -> None:
+        x = pd.to_numeric(s, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        x = x[np.isfinite(x)]
+        if not len(x):
+            return
+        self._bucket(self.pos, x[x > 0])
+        self._bucket(self.neg, -x[x < 0])
+        self.zeros += int(np.count_nonzero(x == 0))
+        self.count += len(x)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self.sum += float(x.sum())
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        out = QuantileSketch.from_dict(self.to_dict())
+        for mine, theirs in ((out.pos, other.pos), (out.neg, other.neg)):
+            for i, c in theirs.items():
+                mine[i] = mine.get(i, 0) + c
+        out.zeros += other.zeros
+        out.count += other.count
+        out.min = min(out.min, other.min)
+        out.max = max(out.max, other.max)
+        out.sum += other.sum
+        return out
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        value = lambda i: 2 * self.gamma ** i / (self.gamma + 1)
+        buckets = [(-value(i), c) for i, c in sorted(self.neg.items(), reverse=True)]
+        buckets.append((0.0, self.zeros))
+        buckets += [(value(i), c) for i, c in sorted(self.pos.items())]
+        for v, c in buckets:
+            seen += c
+            if c and seen > rank:
+                return min(max(v, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rel_accuracy": self.rel_accuracy,
+            "pos": {str(k): v for k, v in self.pos.items()},
+            "neg": {str(k): v for k, v in self.neg.items()},
+            "zeros": self.zeros, "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "sum": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        out = cls(d["rel_accuracy"])
+        out.pos = {int(k): v for k, v in d["pos"].items()}
+        out.neg = {int(k): v for k, v in d["neg"].items()}
+        out.zeros, out.count, out.sum = d["zeros"], d["count"], d["sum"]
+        out.min = d["min"] if d["min"] is not None else math.inf
+        out.max = d["max"] if d["max"] is not None else -math.inf
+        return out
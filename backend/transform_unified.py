@@ -15,6 +15,9 @@ def run_transform_unified():
     from pathlib import Path
     from datetime import datetime
     import pandas as pd
+    from banks import bank_names
+    from unified_query import ensure_key_indexes, mark_rebuilt
+    from dtype_optimizer import STRING_DTYPE, optimize_dtypes, origin_column
 
     BASE = Path(__file__).parent
     DB_PATH = BASE / "merged_banks.db"
@@ -52,7 +55,7 @@ def run_transform_unified():
             s = df[col]
             t = (t or "string").lower()
             if t == "string":
-                s = s.astype("string").str.strip()
+                s = s.astype(STRING_DTYPE).str.strip()
             elif t == "float":
                 s = pd.to_numeric(s, errors="coerce")
             elif t == "date":
@@ -60,41 +63,56 @@ def run_transform_unified():
             df[col] = s
         return df
 
-    def build_mappings_from_resolved(spec: dict, a_cols: list[str], b_cols: list[str]):
+    def spec_tables(spec: dict) -> dict[str, str]:
+        """{bank: physical table}; falls back to the legacy bankA_table/bankB_table keys."""
+        tables = spec.get("tables")
+        if not tables:
+            a, b = bank_names()[:2]
+            tables = {a: spec.get("bankA_table"), b: spec.get("bankB_table")}
+        return {bank: t for bank, t in tables.items() if t}
+
+    def column_sources(c: dict) -> dict[str, str]:
+        sources = c.get("sources")
+        if not sources:
+            a, b = bank_names()[:2]
+            sources = {a: c.get("bankA"), b: c.get("bankB")}
+        return sources
+
+    def build_mappings_from_resolved(spec: dict, cols_by_bank: dict[str, list[str]]):
         cols_meta = spec.get("columns", [])
         dropped, types, good = [], {}, []
-        a_set, b_set = set(a_cols), set(b_cols)
+        col_sets = {bank: set(cols) for bank, cols in cols_by_bank.items()}
 
         for c in cols_meta:
             unified = (c.get("unified") or "").strip()
-            a_phys = (c.get("bankA") or "").strip() or None
-            b_phys = (c.get("bankB") or "").strip() or None
 
             if not unified or unified.upper() == "UNIFIED":
                 dropped.append({**c, "reason": "placeholder_unified"})
                 continue
 
-            a_ok = bool(a_phys and a_phys in a_set)
-            b_ok = bool(b_phys and b_phys in b_set)
-            if not (a_ok or b_ok):
+            found = {}
+            for bank, phys in column_sources(c).items():
+                phys = (phys or "").strip() or None
+                if phys and phys in col_sets.get(bank, ()):
+                    found[bank] = phys
+            if not found:
                 dropped.append({**c, "reason": "no_physical_source_found"})
                 continue
 
-            good.append((a_phys if a_ok else None, b_phys if b_ok else None, unified))
+            good.append((found, unified))
             types[unified] = (c.get("type") or "string").lower()
 
         return good, dropped, types
 
-    def auto_infer_mappings_using_intersection(a_cols: list[str], b_cols: list[str]):
-        a_map = {norm(c): c for c in a_cols}
-        b_map = {norm(c): c for c in b_cols}
-        shared_keys = sorted(set(a_map.keys()) & set(b_map.keys()))
+    def auto_infer_mappings_using_intersection(cols_by_bank: dict[str, list[str]]):
+        maps = {bank: {norm(c): c for c in cols} for bank, cols in cols_by_bank.items()}
+        shared_keys = sorted(set.intersection(*(set(m) for m in maps.values())))
+        first = next(iter(maps))
         good = []
         for k in shared_keys:
-            a_phys, b_phys = a_map[k], b_map[k]
-            unified = a_phys
-            good.append((a_phys, b_phys, unified))
-        types = {u: "string" for _, _, u in good}
+            # Unified name follows the canonical (first) bank's physical column
+            good.append(({bank: m[k] for bank, m in maps.items()}, maps[first][k]))
+        types = {u: "string" for _, u in good}
         return good, types
 
     def collapse_rename(d: dict) -> dict:
@@ -125,19 +143,20 @@ def run_transform_unified():
     try:
         for spec in resolved:
             logical = spec.get("logical_table") or "Unknown"
-            a_tbl = spec.get("bankA_table")
-            b_tbl = spec.get("bankB_table")
+            tables = spec_tables(spec)
+            present = {bank: t for bank, t in tables.items() if table_exists(conn, t)}
 
-            if not (a_tbl and b_tbl) or not (table_exists(conn, a_tbl) and table_exists(conn, b_tbl)):
+            if len(present) < 2:
                 print(f"[transform_unified] ⚠️  {logical}: physical tables missing in SQLite; skipping")
                 continue
+            for bank in tables.keys() - present.keys():
+                print(f"[transform_unified] ⚠️  {logical}: {bank} table {tables[bank]} missing in SQLite; unifying the rest")
 
-            a_cols = list_cols(conn, a_tbl)
-            b_cols = list_cols(conn, b_tbl)
+            cols_by_bank = {bank: list_cols(conn, t) for bank, t in present.items()}
 
-            good, dropped, types = build_mappings_from_resolved(spec, a_cols, b_cols)
+            good, dropped, types = build_mappings_from_resolved(spec, cols_by_bank)
             if not good:
-                good, types = auto_infer_mappings_using_intersection(a_cols, b_cols)
+                good, types = auto_infer_mappings_using_intersection(cols_by_bank)
                 if good:
                     inferred.append(logical)
                     print(f"[transform_unified] ℹ️  {logical}: no usable mappings; AUTO-INFER matched {len(good)} columns by name.")
@@ -146,39 +165,29 @@ def run_transform_unified():
 
             if not good:
                 pd.DataFrame(columns=["bank_origin"]).to_sql(unified_name, conn, if_exists="replace", index=False)
+                mark_rebuilt(conn, unified_name)
                 print(f"[transform_unified] 🟡 {logical}: no columns matched — wrote empty marker {unified_name}")
                 empties.append(unified_name)
                 continue
 
-            a_sel = [a for (a, _, _) in good if a]
-            b_sel = [b for (_, b, _) in good if b]
-            a_rename_raw = {a: u for (a, _, u) in good if a}
-            b_rename_raw = {b: u for (_, b, u) in good if b}
-            a_rename = collapse_rename(a_rename_raw)
-            b_rename = collapse_rename(b_rename_raw)
+            unified_cols = sorted({u for (_, u) in good})
 
-            unified_cols = sorted({u for (_, _, u) in good})
+            frames = []
+            for bank, tbl in present.items():
+                sel = [src[bank] for (src, _) in good if bank in src]
+                rename = collapse_rename({src[bank]: u for (src, u) in good if bank in src})
 
-            dfA = select_cols(conn, a_tbl, a_sel)
-            dfB = select_cols(conn, b_tbl, b_sel)
+                df = select_cols(conn, tbl, sel)
+                if df.empty:
+                    continue
+                df.rename(columns=rename, inplace=True)
+                if df.columns.duplicated().any():
+                    print(f"[transform_unified] ℹ️  {logical}: {bank} produced duplicate unified columns; keeping first occurrence.")
+                    df = df.loc[:, ~df.columns.duplicated()].copy()
+                df["bank_origin"] = origin_column(bank, len(df), present)
+                frames.append(df.reindex(columns=unified_cols + ["bank_origin"]))
 
-            if not dfA.empty:
-                dfA.rename(columns=a_rename, inplace=True)
-                if dfA.columns.duplicated().any():
-                    print(f"[transform_unified] ℹ️  {logical}: BankA produced duplicate unified columns; keeping first occurrence.")
-                    dfA = dfA.loc[:, ~dfA.columns.duplicated()].copy()
-                dfA["bank_origin"] = "BankA"
-                dfA = dfA.reindex(columns=unified_cols + ["bank_origin"])
-
-            if not dfB.empty:
-                dfB.rename(columns=b_rename, inplace=True)
-                if dfB.columns.duplicated().any():
-                    print(f"[transform_unified] ℹ️  {logical}: BankB produced duplicate unified columns; keeping first occurrence.")
-                    dfB = dfB.loc[:, ~dfB.columns.duplicated()].copy()
-                dfB["bank_origin"] = "BankB"
-                dfB = dfB.reindex(columns=unified_cols + ["bank_origin"])
-
-            unified_df = pd.concat([dfA, dfB], ignore_index=True)
+            unified_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
             if unified_df.columns.duplicated().any():
                 print(f"[transform_unified] ℹ️  {logical}: Deduplicating unified columns after concat; keeping first.")
@@ -186,12 +195,16 @@ def run_transform_unified():
 
             if unified_df.empty:
                 pd.DataFrame(columns=unified_cols + ["bank_origin"]).to_sql(unified_name, conn, if_exists="replace", index=False)
+                mark_rebuilt(conn, unified_name)
                 print(f"[transform_unified] 🟡 {logical}: no rows found but columns matched — wrote empty structure {unified_name}")
                 empties.append(unified_name)
                 continue
 
             unified_df = cast_types(unified_df, types)
+            unified_df, memory = optimize_dtypes(unified_df, skip=["bank_origin"])
             unified_df.to_sql(unified_name, conn, if_exists="replace", index=False)
+            mark_rebuilt(conn, unified_name)
+            indexed = ensure_key_indexes(conn, unified_name)
 
             print(
                 f"[transform_unified] ✅ {logical}: wrote {unified_name} — rows={len(unified_df)}, "
@@ -207,7 +220,9 @@ def run_transform_unified():
                 "logical_table": logical,
                 "table": unified_name,
                 "rows": len(unified_df),
-                "cols": len(unified_df.columns) - 1
+                "cols": len(unified_df.columns) - 1,
+                "indexed_columns": indexed,
+                "memory_bytes": memory
             })
 
         manifest = {
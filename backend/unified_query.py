@@ -0,0 +1,357 @@
+import base64
+import csv
+import io
+import json
+import math
+import re
+import sqlite3
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+BASE = Path(__file__).parent
+DB_PATH = BASE / "merged_banks.db"
+UNIFIED_PREFIX = "Unified_"
+# Key-like columns (customerId, accountId, transactionReference, ...): indexed automatically here,
+# and the columns data_profiling and conflict_detection treat as cross-bank keys
+KEY_COLUMN = re.compile(r"(id|key|number|reference)$", re.I)
+INDEXED_ALWAYS = {"bank_origin"}
+MAX_PAGE = 5000
+EXPORT_BATCH = 50_000
+XLSX_MAX_ROWS = 1_048_576        # Excel's per-sheet limit, header included
+XLSX_SHEET_BYTES = 3 << 30       # also roll over before a sheet's XML nears the 4 GiB non-ZIP64 entry limit
+# One row per Unified_* table, replaced with a fresh id every time the table is rebuilt
+GENERATION_TABLE = "Table_Generations"
+
+def list_unified_tables(conn: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ? ORDER BY name", (UNIFIED_PREFIX + "%",)
+    )]
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+def _check_table(conn: sqlite3.Connection, table: str) -> List[str]:
+    if not table.startswith(UNIFIED_PREFIX) or table not in list_unified_tables(conn):
+        raise KeyError(table)
+    return table_columns(conn, table)
+
+def ensure_key_indexes(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Create indexes on key-like columns so keyset pages and filters are index seeks."""
+    created = []
+    for col in table_columns(conn, table):
+        if col in INDEXED_ALWAYS or KEY_COLUMN.search(col):
+            name = re.sub(r"[^A-Za-z0-9_]+", "_", f"ix_{table}_{col}")
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ("{col}")')
+            created.append(col)
+    conn.commit()
+    return created
+
+def mark_rebuilt(conn: sqlite3.Connection, table: str) -> str:
+    """Record that `table` was (re)written from scratch; readers holding an older id must start over."""
+    generation = uuid.uuid4().hex
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{GENERATION_TABLE}" (table_name TEXT PRIMARY KEY, generation TEXT)')
+    conn.execute(f'INSERT OR REPLACE INTO "{GENERATION_TABLE}" VALUES (?, ?)', (table, generation))
+    conn.commit()
+    return generation
+
+def table_generation(conn: sqlite3.Connection, table: str) -> Optional[str]:
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (GENERATION_TABLE,)).fetchone():
+        return None
+    row = conn.execute(f'SELECT generation FROM "{GENERATION_TABLE}" WHERE table_name = ?', (table,)).fetchone()
+    return row[0] if row else None
+
+def describe_tables(db_path: Path = DB_PATH) -> List[Dict[str, Any]]:
+    """Unified tables with columns, indexed columns and an approximate row count (MAX(rowid))."""
+    conn = sqlite3.connect(db_path)
+    try:
+        out = []
+        for table in list_unified_tables(conn):
+            indexed = set()
+            for idx in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+                indexed |= {r[2] for r in conn.execute(f'PRAGMA index_info("{idx[1]}")')}
+            out.append({
+                "table": table,
+                "columns": table_columns(conn, table),
+                "indexed_columns": sorted(c for c in indexed if c),
+                "approx_rows": conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0,
+            })
+        return out
+    finally:
+        conn.close()
+
+# --- Keyset pagination ---
+
+def _encode_cursor(value: Any, rowid: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, rowid]).encode()).decode()
+
+def _decode_cursor(cursor: str):
+    value, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return value, int(rowid)
+
+def _where(filters: Dict[str, str], cols: List[str]):
+    clauses, args = [], []
+    for col, value in filters.items():
+        if col not in cols:
+            raise ValueError(f"Unknown column: {col}")
+        clauses.append(f'"{col}" = ?')
+        args.append(value)
+    return clauses, args
+
+def fetch_page(table: str, limit: int = 100, cursor: Optional[str] = None, order_by: Optional[str] = None,
+               filters: Optional[Dict[str, str]] = None, db_path: Path = DB_PATH) -> Dict[str, Any]:
+    """
+    One page of a unified table ordered by (order_by, rowid). The returned
+    next_cursor continues after the last row without OFFSET scans.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cols = _check_table(conn, table)
+        if order_by and order_by not in cols:
+            raise ValueError(f"Unknown column: {order_by}")
+        clauses, args = _where(filters or {}, cols)
+        limit = min(max(limit, 1), MAX_PAGE)
+
+        if cursor:
+            value, rowid = _decode_cursor(cursor)
+            if not order_by:
+                clauses.append("rowid > ?")
+                args.append(rowid)
+            elif value is None:
+                # NULLs sort first in SQLite: finish the NULL run, then everything non-NULL
+                clauses.append(f'(("{order_by}" IS NULL AND rowid > ?) OR "{order_by}" IS NOT NULL)')
+                args.append(rowid)
+            else:
+                clauses.append(f'("{order_by}", rowid) > (?, ?)')
+                args += [value, rowid]
+
+        order = f'"{order_by}", rowid' if order_by else "rowid"
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cur = conn.execute(f'SELECT rowid AS _rowid, * FROM "{table}"{where} ORDER BY {order} LIMIT ?', args + [limit])
+        names = [d[0] for d in cur.description]
+        rows = [dict(zip(names, r)) for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[order_by] if order_by else None, last["_rowid"])
+    for r in rows:
+        r.pop("_rowid")
+    return {"table": table, "rows": rows, "next_cursor": next_cursor}
+
+# --- Streaming exports ---
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained by the exporter after each batch."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+def _batches(table: str, filters: Optional[Dict[str, str]], db_path: Path, batch: int):
+    """Yield [(column, declared_type), ...] first, then row tuples `batch` at a time."""
+    # StreamingResponse advances this generator from whichever threadpool worker is free;
+    # calls never overlap, so sharing the connection across threads is safe
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        _check_table(conn, table)
+        info = [(r[1], (r[2] or "").upper()) for r in conn.execute(f'PRAGMA table_info("{table}")')]
+        clauses, args = _where(filters or {}, [c for c, _ in info])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cur = conn.execute(f'SELECT * FROM "{table}"{where} ORDER BY rowid', args)
+        yield info
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def _csv_stream(batches) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c for c, _ in next(batches)])
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+def _arrow_type(pa, declared: str):
+    # SQLite type affinity rules; anything else (TEXT, TIMESTAMP, untyped) is exported as text
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+def _parquet_stream(batches) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Schema comes from the declared column types, so every row group has the same layout
+    info = next(batches)
+    schema = pa.schema([(c, _arrow_type(pa, t)) for c, t in info])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            arrays = []
+            for i, field in enumerate(schema):
+                col = [r[i] for r in rows]
+                if pa.types.is_string(field.type):
+                    col = [v if v is None or isinstance(v, str) else str(v) for v in col]
+                arrays.append(pa.array(col, type=field.type, from_pandas=True))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_SHEET_HEAD = f'{_XML_DECL}<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+_SHEET_TAIL = "</sheetData></worksheet>"
+_STYLES = (
+    f'{_XML_DECL}<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'
+)
+
+def _xlsx_cell(v) -> str:
+    # Cells carry no r="A1" reference, so NULLs still need an empty <c/> to keep columns aligned
+    if v is None:
+        return "<c/>"
+    if isinstance(v, (int, float)) and math.isfinite(v):
+        return f"<c><v>{v!r}</v></c>"
+    if isinstance(v, bytes):
+        v = v.decode("utf-8", "replace")
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_ILLEGAL.sub("", str(v)))}</t></is></c>'
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+def _xlsx_package(sheets: int) -> Dict[str, str]:
+    """Workbook parts listing the sheets; written after them, once the sheet count is known."""
+    names = ["data"] + [f"data_{i}" for i in range(2, sheets + 1)]
+    sheet_types = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheets + 1)
+    )
+    return {
+        "xl/workbook.xml": (
+            f'{_XML_DECL}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+            + "".join(f'<sheet name="{n}" sheetId="{i}" r:id="rId{i}"/>' for i, n in enumerate(names, 1))
+            + "</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{_XML_DECL}<Relationships xmlns="{_PKG_REL_NS}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                      for i in range(1, sheets + 1))
+            + f'<Relationship Id="rId{sheets + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>'
+        ),
+        "xl/styles.xml": _STYLES,
+        "_rels/.rels": (
+            f'{_XML_DECL}<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "[Content_Types].xml": (
+            f'{_XML_DECL}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{sheet_types}</Types>"
+        ),
+    }
+
+def _xlsx_stream(batches) -> Iterator[bytes]:
+    # Sheet XML is deflated into the zip batch by batch. On the unseekable sink ZipFile writes
+    # data descriptors after each entry, and the parts that list the sheets go in last.
+    header = _xlsx_row([c for c, _ in next(batches)])
+    sink = _ChunkSink()
+    zf = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+    sheet, sheets, used, size = None, 0, XLSX_MAX_ROWS, 0
+    try:
+        for rows in batches:
+            buf = []
+            for r in rows:
+                if used == XLSX_MAX_ROWS or size >= XLSX_SHEET_BYTES:
+                    # Tables past Excel's row limit continue on data_2, data_3, ...
+                    if sheet is not None:
+                        sheet.write(("".join(buf) + _SHEET_TAIL).encode("utf-8"))
+                        sheet.close()
+                    sheets += 1
+                    sheet = zf.open(f"xl/worksheets/sheet{sheets}.xml", "w")
+                    buf, used, size = [_SHEET_HEAD, header], 1, 0
+                buf.append(_xlsx_row(r))
+                used += 1
+            data = "".join(buf).encode("utf-8")
+            sheet.write(data)
+            size += len(data)
+            yield sink.drain()
+        if sheet is None:
+            sheets = 1
+            sheet = zf.open("xl/worksheets/sheet1.xml", "w")
+            sheet.write((_SHEET_HEAD + header).encode("utf-8"))
+        sheet.write(_SHEET_TAIL.encode("utf-8"))
+        sheet.close()
+        for name, xml in _xlsx_package(sheets).items():
+            zf.writestr(name, xml)
+    finally:
+        if sheet is not None and not sheet.closed:
+            sheet.close()
+        zf.close()
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", _csv_stream),
+    "parquet": ("application/vnd.apache.parquet", _parquet_stream),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _xlsx_stream),
+}
+
+def export_table(table: str, fmt: str = "csv", filters: Optional[Dict[str, str]] = None,
+                 db_path: Path = DB_PATH, batch: int = EXPORT_BATCH) -> Iterator[bytes]:
+    """Yield the export file in pieces, reading the table EXPORT_BATCH rows at a time."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    conn = sqlite3.connect(db_path)
+    try:
+        cols = _check_table(conn, table)
+        _where(filters or {}, cols)
+    finally:
+        conn.close()
+    return EXPORT_FORMATS[fmt][1](_batches(table, filters, db_path, batch))